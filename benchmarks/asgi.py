@@ -0,0 +1,242 @@
+"""
+Пропускная способность страниц чтения под ASGI и под WSGI.
+
+База заполняется один раз, затем для каждого режима запускается
+отдельный процесс: wsgi обслуживает синхронные страницы из пула
+потоков-воркеров, asgi — асинхронные страницы (ASYNC_READ_VIEWS)
+из одного цикла событий. Запросы передаются приложению напрямую,
+без сети, а число одновременных соединений задаётся --concurrency.
+
+Запуск из корня репозитория:
+    python -m benchmarks.asgi news --scale 100000 --concurrency 1,16,64
+    python -m benchmarks.asgi note --output note.json
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from .routes import PROJECTS as SEEDS
+from .utils import BASE_DIR, migrate, percentiles, setup_django
+
+MODES = ('wsgi', 'asgi')
+
+
+def read_routes(project, author):
+    """Пути страниц чтения, которые есть в асинхронном варианте."""
+    from django.urls import reverse
+
+    if project == 'news':
+        from news.models import News
+
+        news = News.objects.order_by('id').first()
+        return {
+            'news:home': reverse('news:home'),
+            'news:detail': reverse('news:detail', args=(news.pk,)),
+        }
+    from notes.models import Note
+
+    note = Note.objects.filter(author=author).order_by('id').first()
+    return {
+        'notes:list': reverse('notes:list'),
+        'notes:detail': reverse('notes:detail', args=(note.slug,)),
+    }
+
+
+def session_cookie(author):
+    from django.test import Client
+
+    client = Client()
+    client.force_login(author)
+    return f'sessionid={client.cookies["sessionid"].value}'
+
+
+def wsgi_sender(cookie):
+    """Вызов WSGI-приложения проекта, как это делает сервер."""
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+
+    def send(path):
+        statuses = []
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'HTTP_HOST': 'testserver',
+            'HTTP_COOKIE': cookie,
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(),
+            'wsgi.errors': sys.stderr,
+        }
+        result = application(
+            environ, lambda status, headers: statuses.append(status)
+        )
+        try:
+            b''.join(result)
+        finally:
+            result.close()
+        return int(statuses[0].split()[0])
+
+    return send
+
+
+def run_wsgi(paths, requests, concurrency, cookie):
+    send = wsgi_sender(cookie)
+
+    def timed(path):
+        started = time.perf_counter()
+        status = send(path)
+        return (time.perf_counter() - started) * 1000, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(timed, paths * requests))
+    return results, time.perf_counter() - started
+
+
+def run_asgi(paths, requests, concurrency, cookie):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+
+    async def send(path):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'root_path': '',
+            'query_string': b'',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'cookie', cookie.encode()),
+            ],
+            'server': ('testserver', 80),
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def collect(message):
+            messages.append(message)
+
+        started = time.perf_counter()
+        await application(scope, receive, collect)
+        return (time.perf_counter() - started) * 1000, messages[0]['status']
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(path):
+            async with semaphore:
+                return await send(path)
+
+        return await asyncio.gather(*(
+            limited(path) for path in paths * requests
+        ))
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    return results, time.perf_counter() - started
+
+
+def worker(args):
+    """Замеры одного режима в отдельном процессе; печатает JSON."""
+    setup_django(args.project, args.database)
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+
+    settings.ASYNC_READ_VIEWS = args.worker == 'asgi'
+    author = get_user_model().objects.order_by('id').first()
+    cookie = session_cookie(author)
+    run = run_asgi if args.worker == 'asgi' else run_wsgi
+    report = []
+    for name, path in read_routes(args.project, author).items():
+        for concurrency in args.concurrency:
+            results, duration = run(
+                [path], args.requests, concurrency, cookie
+            )
+            report.append({
+                'mode': args.worker,
+                'route': name,
+                'concurrency': concurrency,
+                'requests': len(results),
+                'errors': sum(1 for _, status in results if status >= 400),
+                'throughput_rps': round(len(results) / duration, 1),
+                'latency_ms': {
+                    key: round(value, 3) for key, value in percentiles(
+                        [latency for latency, _ in results]
+                    ).items()
+                },
+            })
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('project', choices=SEEDS)
+    parser.add_argument('--scale', type=int, default=10_000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument(
+        '--concurrency',
+        type=lambda value: [int(level) for level in value.split(',')],
+        default=[1, 16, 64],
+    )
+    parser.add_argument('--output', help='файл для JSON, по умолчанию stdout')
+    parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = Path(directory) / 'bench.sqlite3'
+        setup_django(args.project, database)
+        migrate()
+        seed, _ = SEEDS[args.project]
+        seed(args.scale, 0)
+        results = []
+        for mode in MODES:
+            output = subprocess.run(
+                (
+                    sys.executable, '-m', 'benchmarks.asgi', args.project,
+                    '--worker', mode,
+                    '--database', str(database),
+                    '--requests', str(args.requests),
+                    '--concurrency', ','.join(map(str, args.concurrency)),
+                ),
+                cwd=BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout
+            results.extend(json.loads(output))
+    for result in results:
+        print(
+            f'{result["mode"]} {result["route"]} '
+            f'x{result["concurrency"]}: {result["throughput_rps"]} rps, '
+            f'p95 {result["latency_ms"]["p95"]} ms',
+            file=sys.stderr,
+        )
+    report = json.dumps({
+        'project': args.project,
+        'scale': args.scale,
+        'results': results,
+    }, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(report, encoding='utf-8')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Проверка комментария на запрещённые слова: цикл с `in` против
+скомпилированного словаря news.moderation.BadWordsMatcher.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bad_words --words 20000 --text-length 2000
+"""
+import argparse
+import random
+import time
+
+from .utils import measure, setup_django
+
+ALPHABET = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+
+
+def random_word(rng):
+    return ''.join(rng.choices(ALPHABET, k=rng.randint(5, 12)))
+
+
+def loop_check(words, text):
+    lowered_text = text.lower()
+    return [word for word in words if word in lowered_text]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--words', type=int, default=20_000)
+    parser.add_argument('--text-length', type=int, default=2_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django('news')
+    from news.moderation import BadWordsMatcher
+
+    rng = random.Random(args.seed)
+    words = [random_word(rng) for _ in range(args.words)]
+    text = ' '.join(
+        random_word(rng) for _ in range(args.text_length // 9)
+    )
+
+    started = time.perf_counter()
+    matcher = BadWordsMatcher(words)
+    matcher.find_all('')
+    build = (time.perf_counter() - started) * 1000
+
+    loop = measure(lambda: loop_check(words, text), args.repeat)
+    compiled = measure(lambda: matcher.find_all(text), args.repeat)
+    print(f'слов в словаре: {args.words}, длина текста: {len(text)}')
+    print(f'цикл по словам: {loop:.3f} ms')
+    print(f'BadWordsMatcher: {compiled:.3f} ms (сборка {build:.1f} ms)')
+
+
+if __name__ == '__main__':
+    main()
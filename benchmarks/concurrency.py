@@ -0,0 +1,209 @@
+"""
+Одновременные чтение и запись при основных и боевых настройках базы.
+
+База заполняется один раз и копируется для каждого профиля настроек:
+settings (журнал отката, новое соединение на каждый запрос) и
+settings_production (WAL, busy_timeout, постоянные соединения).
+Профиль запускается в отдельном процессе с WSGI-сервером, к которому
+--readers потоков обращаются за страницей чтения, а --writers потоков
+в это же время добавляют комментарии или заметки.
+
+Запуск из корня репозитория:
+    python -m benchmarks.concurrency news --readers 8 --writers 2
+    python -m benchmarks.concurrency note --duration 10 --output note.json
+"""
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from .routes import PASSWORD, HttpClient, serve
+from .routes import PROJECTS as SEEDS
+from .utils import BASE_DIR, migrate, percentiles, setup_django
+
+PROFILES = {
+    'news': {
+        'default': 'yanews.settings',
+        'production': 'yanews.settings_production',
+    },
+    'note': {
+        'default': 'yanote.settings',
+        'production': 'yanote.settings_production',
+    },
+}
+
+
+def workload(project, author):
+    """Запрос чтения и запрос записи номер index для проекта."""
+    from django.urls import reverse
+
+    if project == 'news':
+        from news.models import News
+
+        news = News.objects.order_by('id').first()
+        detail = reverse('news:detail', args=(news.pk,))
+        return (
+            lambda client, index: client.get(detail),
+            lambda client, index: client.post(
+                detail, {'text': f'Комментарий {index}'}
+            ),
+        )
+    notes_list = reverse('notes:list')
+    add = reverse('notes:add')
+    return (
+        lambda client, index: client.get(notes_list),
+        lambda client, index: client.post(
+            add, {'title': f'Запись {index}', 'text': 'Текст', 'slug': ''}
+        ),
+    )
+
+
+def run_threads(address, username, actions, duration):
+    """
+    Запускает потоки до истечения duration секунд.
+
+    actions — пары (вид запроса, функция); у каждого потока свой клиент.
+    Возвращает задержки и коды ответов по видам запросов.
+    """
+    results = {kind: [] for kind, _ in actions}
+    lock = threading.Lock()
+    # Вход с хешированием пароля не должен попадать в замер.
+    clients = [HttpClient(address, username) for _ in actions]
+    deadline = time.perf_counter() + duration
+
+    def worker(kind, send, number):
+        client = clients[number]
+        local = []
+        index = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status, _ = send(client, f'{number}-{index}')
+            except Exception:
+                status = None
+            local.append(((time.perf_counter() - started) * 1000, status))
+            index += 1
+        with lock:
+            results[kind].extend(local)
+
+    threads = [
+        threading.Thread(target=worker, args=(kind, send, number))
+        for number, (kind, send) in enumerate(actions)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def worker(args):
+    """Замеры одного профиля в отдельном процессе; печатает JSON."""
+    setup_django(
+        args.project, args.database, PROFILES[args.project][args.worker]
+    )
+    from django.contrib.auth import get_user_model
+
+    author = get_user_model().objects.order_by('id').first()
+    read, write = workload(args.project, author)
+    actions = (
+        [('read', read)] * args.readers + [('write', write)] * args.writers
+    )
+    with serve() as address:
+        results = run_threads(
+            address, author.username, actions, args.duration
+        )
+    report = {'profile': args.worker}
+    for kind, requests in results.items():
+        report[kind] = {
+            'requests': len(requests),
+            'errors': sum(
+                1 for _, status in requests
+                if status is None or status >= 400
+            ),
+            'throughput_rps': round(len(requests) / args.duration, 1),
+            'latency_ms': {
+                key: value and round(value, 3) for key, value in percentiles(
+                    [latency for latency, _ in requests]
+                ).items()
+            },
+        }
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('project', choices=PROFILES)
+    parser.add_argument('--scale', type=int, default=10_000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--output', help='файл для JSON, по умолчанию stdout')
+    parser.add_argument(
+        '--worker', choices=('default', 'production'), help=argparse.SUPPRESS
+    )
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    with tempfile.TemporaryDirectory() as directory:
+        seeded = Path(directory) / 'seed.sqlite3'
+        setup_django(args.project, seeded)
+        from django.contrib.auth import get_user_model
+
+        migrate()
+        seed, _ = SEEDS[args.project]
+        seed(args.scale, 0)
+        author = get_user_model().objects.order_by('id').first()
+        author.set_password(PASSWORD)
+        author.save()
+        results = []
+        for profile in PROFILES[args.project]:
+            # WAL сохраняется в файле базы, поэтому у профиля своя копия.
+            database = Path(directory) / f'{profile}.sqlite3'
+            shutil.copy(seeded, database)
+            output = subprocess.run(
+                (
+                    sys.executable, '-m', 'benchmarks.concurrency',
+                    args.project,
+                    '--worker', profile,
+                    '--database', str(database),
+                    '--readers', str(args.readers),
+                    '--writers', str(args.writers),
+                    '--duration', str(args.duration),
+                ),
+                cwd=BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout
+            results.append(json.loads(output))
+    for result in results:
+        for kind in ('read', 'write'):
+            if kind in result:
+                print(
+                    f'{result["profile"]} {kind}: '
+                    f'{result[kind]["throughput_rps"]} rps, '
+                    f'p95 {result[kind]["latency_ms"]["p95"]} ms, '
+                    f'ошибок {result[kind]["errors"]}',
+                    file=sys.stderr,
+                )
+    report = json.dumps({
+        'project': args.project,
+        'scale': args.scale,
+        'readers': args.readers,
+        'writers': args.writers,
+        'duration_s': args.duration,
+        'results': results,
+    }, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(report, encoding='utf-8')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
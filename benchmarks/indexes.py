@@ -0,0 +1,95 @@
+"""
+Планы и время горячих запросов без составных индексов и с ними.
+
+База заполняется заданным числом строк, затем каждый запрос выполняется
+дважды: после удаления индексов из Meta.indexes и после их создания.
+
+Запуск из корня репозитория:
+    python -m benchmarks.indexes --rows 1000000
+
+У заметок составных индексов нет: выборку по автору обслуживает
+индекс внешнего ключа author_id, поэтому проект note здесь не замеряется.
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+from .utils import measure, migrate, setup_django
+
+USERS_COUNT = 100
+COMMENTS_PER_NEWS = 100
+PAGE_SIZE = 20
+
+
+def seed_news(rows):
+    from news.models import Comment, News
+    from news.pytest_tests.factories import (
+        CommentFactory, NewsFactory, UserFactory
+    )
+
+    user_ids = [user.pk for user in UserFactory().create_batch(USERS_COUNT)]
+    news_ids = [
+        news.pk for news in NewsFactory().create_batch(
+            max(1, rows // COMMENTS_PER_NEWS)
+        )
+    ]
+    CommentFactory().create_many(
+        rows,
+        news_id=lambda index: news_ids[index % len(news_ids)],
+        author_id=lambda index: user_ids[index % len(user_ids)],
+    )
+    news_id = news_ids[len(news_ids) // 2]
+    author_id = user_ids[len(user_ids) // 2]
+    return {
+        'news:home': lambda: News.objects.all()[:10],
+        'news:detail comments': lambda: Comment.objects.filter(
+            news_id=news_id
+        ).order_by('created', 'pk')[:PAGE_SIZE],
+        'comments by author': lambda: Comment.objects.filter(
+            author_id=author_id
+        ).order_by('pk')[:PAGE_SIZE],
+    }, (News, Comment)
+
+
+def set_indexes(models, enabled):
+    from django.db import connection
+
+    with connection.schema_editor() as schema_editor:
+        for model in models:
+            for index in model._meta.indexes:
+                if enabled:
+                    schema_editor.add_index(model, index)
+                else:
+                    schema_editor.remove_index(model, index)
+
+
+def report(queries, repeat):
+    for name, get_queryset in queries.items():
+        duration = measure(lambda: list(get_queryset()), repeat)
+        print(f'{name}: {duration:.3f} ms')
+        print(get_queryset().explain())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django('news', Path(directory) / 'bench.sqlite3')
+        from django.db import transaction
+
+        migrate()
+        with transaction.atomic():
+            queries, models = seed_news(args.rows)
+        set_indexes(models, enabled=False)
+        print('--- без составных индексов ---')
+        report(queries, args.repeat)
+        set_indexes(models, enabled=True)
+        print('--- с составными индексами ---')
+        report(queries, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
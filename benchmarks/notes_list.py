@@ -0,0 +1,77 @@
+"""
+Время и пиковая память страницы notes:list при росте числа заметок.
+
+Для каждого масштаба база дополняется заметками одного пользователя,
+после чего запрашиваются первая страница, последняя страница по номеру
+и страница по курсору after из конца списка.
+
+Запуск из корня репозитория:
+    python -m benchmarks.notes_list --scales 10000,100000,500000
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from .utils import migrate, setup_django
+
+TEXT_SIZE = 1000
+
+
+def profile(client, url, params):
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(url, params)
+    duration = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert response.status_code == 200, response.status_code
+    return duration, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scales', default='10000,100000,500000')
+    parser.add_argument('--text-size', type=int, default=TEXT_SIZE)
+    args = parser.parse_args()
+    scales = sorted(int(scale) for scale in args.scales.split(','))
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django('note', Path(directory) / 'bench.sqlite3')
+        from django.conf import settings
+        from django.test import Client
+        from django.urls import reverse
+        from notes.models import Note
+        from notes.tests.factories import NoteFactory, UserFactory
+
+        migrate()
+        author = UserFactory().create()
+        client = Client()
+        client.force_login(author)
+        url = reverse('notes:list')
+        text = 'х' * args.text_size
+        created = 0
+        for scale in scales:
+            NoteFactory().create_many(
+                scale - created, text=text, author=author
+            )
+            created = scale
+            last_page = -(-scale // settings.NOTES_COUNT_ON_LIST_PAGE)
+            last_id = Note.objects.order_by('-id').values_list(
+                'id', flat=True
+            )[settings.NOTES_COUNT_ON_LIST_PAGE]
+            for name, params in (
+                ('первая страница', {}),
+                ('последняя страница', {'page': last_page}),
+                ('курсор в конце', {'after': last_id}),
+            ):
+                duration, peak = profile(client, url, params)
+                print(
+                    f'{scale} заметок, {name}: '
+                    f'{duration:.1f} ms, пик памяти {peak:.0f} KiB'
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+"""
+Нагрузочный прогон маршрутов YaNews и YaNote с отчётом в JSON.
+
+База SQLite заполняется до каждого из масштабов (новости, комментарии
+или заметки), после чего каждый маршрут запрашивается через тестовый
+клиент Django и через настоящий WSGI-сервер в отдельных потоках.
+Для каждого маршрута сообщаются пропускная способность, перцентили
+задержки и пиковый RSS процесса, в котором работает и сервер.
+
+Запуск из корня репозитория:
+    python -m benchmarks.routes news --scales 1000,100000,1000000
+    python -m benchmarks.routes note --transport wsgi --concurrency 8 \\
+        --output note.json
+"""
+import argparse
+import http.client
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.cookies import SimpleCookie
+from pathlib import Path
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from .utils import (
+    BASE_DIR, migrate, percentiles, setup_django
+)
+
+USERS_COUNT = 10
+COMMENTED_NEWS = 100
+PASSWORD = 'benchmark-password'
+TRANSPORTS = ('client', 'wsgi')
+
+
+class Route:
+    """
+    Маршрут под нагрузкой.
+
+    send(client, target) выполняет один запрос и возвращает ответ;
+    prepare(count), если задан, готовит по объекту на каждый запрос,
+    например комментарии для удаления.
+    """
+
+    def __init__(self, name, send, prepare=None):
+        self.name = name
+        self.send = send
+        self.prepare = prepare or range
+
+
+class TestClient:
+    """Тестовый клиент Django с тем же интерфейсом, что у HttpClient."""
+
+    def __init__(self, user):
+        from django.test import Client
+
+        self.client = Client()
+        self.client.force_login(user)
+
+    def get(self, path, params=None):
+        return read(self.client.get(path, params))
+
+    def post(self, path, data):
+        return read(self.client.post(path, data))
+
+
+def read(response):
+    """Код ответа и размер тела, в том числе потокового."""
+    if response.streaming:
+        return response.status_code, sum(
+            len(chunk) for chunk in response.streaming_content
+        )
+    return response.status_code, len(response.content)
+
+
+class HttpClient:
+    """Минимальный HTTP-клиент с cookie и CSRF-токеном Django."""
+
+    def __init__(self, address, username):
+        from django.urls import reverse
+
+        self.address = address
+        self.cookies = SimpleCookie()
+        login_url = reverse('users:login')
+        self.get(login_url)
+        status, _ = self.post(
+            login_url, {'username': username, 'password': PASSWORD}
+        )
+        assert status == 302, f'Не удалось войти: {status}'
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(
+                f'{key}={morsel.value}' for key, morsel in self.cookies.items()
+            )
+        connection = http.client.HTTPConnection(*self.address)
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            size = len(response.read())
+            for header in response.headers.get_all('Set-Cookie') or ():
+                self.cookies.load(header)
+            return response.status, size
+        finally:
+            connection.close()
+
+    def get(self, path, params=None):
+        from django.utils.http import urlencode
+
+        if params:
+            path = f'{path}?{urlencode(params)}'
+        return self.request('GET', path)
+
+    def post(self, path, data):
+        from django.test.client import (
+            BOUNDARY, MULTIPART_CONTENT, encode_multipart
+        )
+
+        headers = {'Content-Type': MULTIPART_CONTENT}
+        if 'csrftoken' in self.cookies:
+            headers['X-CSRFToken'] = self.cookies['csrftoken'].value
+        return self.request(
+            'POST', path, encode_multipart(BOUNDARY, data), headers
+        )
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve():
+    """Запускает приложение проекта на свободном порту в фоне."""
+    from django.core.wsgi import get_wsgi_application
+
+    server = make_server(
+        '127.0.0.1', 0, get_wsgi_application(),
+        server_class=ThreadingWSGIServer, handler_class=QuietHandler,
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def seed_news(scale, seeded):
+    """Дополняет базу до scale новостей и scale комментариев."""
+    from django.contrib.auth import get_user_model
+    from news.models import News
+    from news.pytest_tests.factories import (
+        CommentFactory, NewsFactory, UserFactory
+    )
+
+    if not seeded:
+        UserFactory().create_many(USERS_COUNT)
+    user_ids = list(get_user_model().objects.values_list('id', flat=True))
+    NewsFactory(seeded).create_many(scale - seeded)
+    news_ids = list(News.objects.order_by('id').values_list(
+        'id', flat=True
+    )[:COMMENTED_NEWS])
+    CommentFactory(seeded).create_many(
+        scale - seeded,
+        news_id=lambda index: news_ids[index % len(news_ids)],
+        author_id=lambda index: user_ids[index % len(user_ids)],
+    )
+
+
+def seed_notes(scale, seeded):
+    """Дополняет базу до scale заметок; фабрика сразу индексирует их."""
+    from django.contrib.auth import get_user_model
+    from notes.tests.factories import NoteFactory, UserFactory
+
+    if not seeded:
+        UserFactory().create_many(USERS_COUNT)
+    user_ids = list(get_user_model().objects.values_list('id', flat=True))
+    NoteFactory(seeded).create_many(
+        scale - seeded,
+        author_id=lambda index: user_ids[index % len(user_ids)],
+    )
+
+
+def news_routes(author):
+    """Маршруты YaNews: лента, новость, комментарии."""
+    from django.urls import reverse
+    from news.models import Comment, News
+    from news.pytest_tests.factories import CommentFactory
+
+    news = News.objects.order_by('id').first()
+    comment = Comment.objects.create(news=news, author=author, text='Мой')
+    detail = reverse('news:detail', args=(news.pk,))
+    edit = reverse('news:edit', args=(comment.pk,))
+
+    def comments_to_delete(count):
+        return [
+            reverse('news:delete', args=(comment.pk,))
+            for comment in CommentFactory().create_batch(
+                count, news=news, author=author
+            )
+        ]
+
+    return (
+        Route('news:home', lambda client, _: client.get(reverse('news:home'))),
+        Route('news:detail', lambda client, _: client.get(detail)),
+        Route('news:comments', lambda client, _: client.get(
+            reverse('news:comments', args=(news.pk,))
+        )),
+        Route('news:detail POST', lambda client, index: client.post(
+            detail, {'text': f'Комментарий {index}'}
+        )),
+        Route('news:edit', lambda client, _: client.get(edit)),
+        Route('news:edit POST', lambda client, index: client.post(
+            edit, {'text': f'Правка {index}'}
+        )),
+        Route(
+            'news:delete POST',
+            lambda client, url: client.post(url, {}),
+            comments_to_delete,
+        ),
+    )
+
+
+def note_routes(author):
+    """Все маршруты notes:* для автора с заметками."""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.urls import reverse
+    from notes.models import Note
+    from notes.tests.factories import NoteFactory
+
+    note = Note.objects.filter(author=author).order_by('id').first()
+    detail = reverse('notes:detail', args=(note.slug,))
+    edit = reverse('notes:edit', args=(note.slug,))
+
+    def notes_to_delete(count):
+        return [
+            reverse('notes:delete', args=(obj.slug,))
+            for obj in NoteFactory().create_batch(count, author=author)
+        ]
+
+    def import_file(index):
+        return SimpleUploadedFile('notes.jsonl', json.dumps({
+            'title': f'Импорт {index}', 'text': 'Текст',
+        }, ensure_ascii=False).encode())
+
+    def get(name):
+        return Route(name, lambda client, _: client.get(reverse(name)))
+
+    return (
+        get('notes:home'),
+        get('notes:list'),
+        get('notes:add'),
+        Route('notes:add POST', lambda client, index: client.post(
+            reverse('notes:add'),
+            {'title': f'Бенчмарк {index}', 'text': 'Текст', 'slug': ''},
+        )),
+        get('notes:success'),
+        Route('notes:detail', lambda client, _: client.get(detail)),
+        Route('notes:edit', lambda client, _: client.get(edit)),
+        Route('notes:edit POST', lambda client, index: client.post(edit, {
+            'title': f'Правка {index}', 'text': 'Текст', 'slug': note.slug,
+        })),
+        Route(
+            'notes:delete POST',
+            lambda client, url: client.post(url, {}),
+            notes_to_delete,
+        ),
+        Route('notes:search', lambda client, _: client.get(
+            reverse('notes:search'), {'q': 'заметки'}
+        )),
+        get('notes:export'),
+        Route('notes:import POST', lambda client, index: client.post(
+            reverse('notes:import'),
+            {'file': import_file(index), 'format': 'jsonl'},
+        )),
+    )
+
+
+PROJECTS = {
+    'news': (seed_news, news_routes),
+    'note': (seed_notes, note_routes),
+}
+
+
+def run_route(route, requests, concurrency, make_client):
+    """Прогоняет маршрут и возвращает его метрики."""
+    targets = list(route.prepare(requests))
+    local = threading.local()
+
+    def send(target):
+        if not hasattr(local, 'client'):
+            local.client = make_client()
+        started = time.perf_counter()
+        try:
+            status, _ = route.send(local.client, target)
+        except Exception:
+            status = None
+        return (time.perf_counter() - started) * 1000, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(send, targets))
+    duration = time.perf_counter() - started
+    return {
+        'route': route.name,
+        'requests': len(results),
+        'errors': sum(
+            1 for _, status in results if status is None or status >= 400
+        ),
+        'throughput_rps': round(len(results) / duration, 1),
+        'latency_ms': {
+            key: round(value, 3) for key, value in percentiles(
+                [latency for latency, _ in results]
+            ).items()
+        },
+        'peak_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run_transport(transport, routes, author, args):
+    """Метрики всех маршрутов через тестовый клиент или WSGI-сервер."""
+    if transport == 'client':
+        # Тестовый клиент не потокобезопасен: запросы идут по одному.
+        return [
+            run_route(route, args.requests, 1, lambda: TestClient(author))
+            for route in routes
+        ]
+    with serve() as address:
+        return [
+            run_route(
+                route,
+                args.requests,
+                args.concurrency,
+                lambda: HttpClient(address, author.username),
+            )
+            for route in routes
+        ]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', 'HEAD'),
+            cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('project', choices=PROJECTS)
+    parser.add_argument('--scales', default='1000,100000,1000000')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument(
+        '--transport', choices=(*TRANSPORTS, 'all'), default='all'
+    )
+    parser.add_argument('--output', help='файл для JSON, по умолчанию stdout')
+    args = parser.parse_args()
+    scales = sorted(int(scale) for scale in args.scales.split(','))
+    transports = TRANSPORTS if args.transport == 'all' else (args.transport,)
+    seed, make_routes = PROJECTS[args.project]
+
+    report = {
+        'project': args.project,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'requests_per_route': args.requests,
+        'concurrency': args.concurrency,
+        'results': [],
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(args.project, Path(directory) / 'bench.sqlite3')
+        from django.contrib.auth import get_user_model
+
+        migrate()
+        seeded = 0
+        for scale in scales:
+            seed(scale, seeded)
+            seeded = scale
+            author = get_user_model().objects.order_by('id').first()
+            author.set_password(PASSWORD)
+            author.save()
+            routes = make_routes(author)
+            for transport in transports:
+                for result in run_transport(transport, routes, author, args):
+                    report['results'].append(
+                        {'scale': scale, 'transport': transport, **result}
+                    )
+                    print(
+                        f'{scale} {transport} {result["route"]}: '
+                        f'{result["throughput_rps"]} rps, '
+                        f'p95 {result["latency_ms"]["p95"]} ms',
+                        file=sys.stderr,
+                    )
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding='utf-8')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
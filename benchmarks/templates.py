@@ -0,0 +1,142 @@
+"""
+Время отрисовки news/home.html и notes/list.html при разных загрузчиках.
+
+Для каждого профиля настроек (основные settings и settings_production
+с кэширующим загрузчиком) в отдельном процессе готовится контекст
+страницы, после чего шаблон много раз получается через get_template
+и отрисовывается — как при каждом запросе к странице. Отдельно
+сообщаются время первой отрисовки и, для боевого профиля, время
+команды precompile_templates при запуске.
+
+Запуск из корня репозитория:
+    python -m benchmarks.templates news --repeat 1000
+    python -m benchmarks.templates note --output note.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .concurrency import PROFILES
+from .routes import PROJECTS as SEEDS
+from .utils import BASE_DIR, migrate, setup_django
+
+TEMPLATES = {
+    'news': 'news/home.html',
+    'note': 'notes/list.html',
+}
+
+
+def page_context(project, request):
+    """Контекст страницы, как его строит представление, без ленивых данных."""
+    if project == 'news':
+        from news.views import NewsList as view_class
+    else:
+        from notes.views import NotesList as view_class
+
+    view = view_class()
+    view.setup(request)
+    view.object_list = view.get_queryset()
+    context = view.get_context_data()
+    # Запросы к базе выполняются до замера.
+    context['object_list'] = list(context['object_list'])
+    if context.get('paginator'):
+        context['paginator'].num_pages
+    return context
+
+
+def worker(args):
+    """Замеры одного профиля в отдельном процессе; печатает JSON."""
+    setup_django(
+        args.project, args.database, PROFILES[args.project][args.worker]
+    )
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.template.loader import get_template
+    from django.test import RequestFactory
+
+    # Фрагмент главной кэшируется; здесь нужна полная отрисовка.
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }
+    }
+    report = {'profile': args.worker, 'template': TEMPLATES[args.project]}
+    if settings.PRECOMPILE_TEMPLATES:
+        started = time.perf_counter()
+        call_command('precompile_templates', verbosity=0)
+        report['precompile_ms'] = round(
+            (time.perf_counter() - started) * 1000, 3
+        )
+    request = RequestFactory().get('/')
+    request.user = get_user_model().objects.order_by('id').first()
+    context = page_context(args.project, request)
+
+    def render():
+        started = time.perf_counter()
+        get_template(TEMPLATES[args.project]).render(context, request)
+        return (time.perf_counter() - started) * 1000
+
+    report['first_render_ms'] = round(render(), 3)
+    report['render_ms'] = round(
+        sum(render() for _ in range(args.repeat)) / args.repeat, 3
+    )
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('project', choices=PROFILES)
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--output', help='файл для JSON, по умолчанию stdout')
+    parser.add_argument(
+        '--worker', choices=('default', 'production'), help=argparse.SUPPRESS
+    )
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = Path(directory) / 'bench.sqlite3'
+        setup_django(args.project, database)
+        migrate()
+        seed, _ = SEEDS[args.project]
+        seed(100, 0)
+        results = []
+        for profile in PROFILES[args.project]:
+            output = subprocess.run(
+                (
+                    sys.executable, '-m', 'benchmarks.templates',
+                    args.project,
+                    '--worker', profile,
+                    '--database', str(database),
+                    '--repeat', str(args.repeat),
+                ),
+                cwd=BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout
+            results.append(json.loads(output))
+    for result in results:
+        print(
+            f'{result["profile"]} {result["template"]}: '
+            f'первая отрисовка {result["first_render_ms"]} ms, '
+            f'далее {result["render_ms"]} ms',
+            file=sys.stderr,
+        )
+    report = json.dumps({
+        'project': args.project,
+        'repeat': args.repeat,
+        'results': results,
+    }, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(report, encoding='utf-8')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Общие помощники для бенчмарков проектов YaNews и YaNote."""
+import os
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+PROJECTS = {
+    'news': ('ya_news', 'yanews.settings'),
+    'note': ('ya_note', 'yanote.settings'),
+}
+
+
+def setup_django(project, database=None, settings_module=None):
+    """
+    Настраивает Django для одного из проектов.
+
+    Если передан путь к файлу SQLite, бенчмарк работает с ним, а не
+    с базой разработки из настроек проекта. settings_module заменяет
+    основные настройки проекта, например боевым профилем.
+    """
+    project_dir, default_settings = PROJECTS[project]
+    sys.path.insert(0, str(BASE_DIR / project_dir))
+    if settings_module:
+        # Процесс-воркер наследует переменную окружения от родителя.
+        os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    else:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', default_settings)
+
+    import django
+    from django.conf import settings
+
+    if database is not None:
+        settings.DATABASES['default']['NAME'] = str(database)
+    # Тестовый клиент Django обращается к хосту testserver.
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    django.setup()
+
+
+def migrate(*args):
+    """Применяет миграции без вывода в консоль."""
+    from django.core.management import call_command
+
+    call_command('migrate', *args, verbosity=0)
+
+
+def measure(func, repeat):
+    """Среднее время выполнения func в миллисекундах."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def percentiles(values, points=(50, 95, 99)):
+    """Перцентили по методу ближайшего ранга."""
+    values = sorted(values)
+    if not values:
+        return {f'p{point}': None for point in points}
+    return {
+        f'p{point}': values[max(0, -(-len(values) * point // 100) - 1)]
+        for point in points
+    }
@@ -15,34 +15,55 @@ print_message () {
 }
 
 
+# Быстрый профиль настроек: база в памяти, без миграций, хешер MD5.
+# Полный прогон: YANEWS_SETTINGS=yanews.settings YANOTE_SETTINGS=yanote.settings
+YANEWS_SETTINGS="${YANEWS_SETTINGS:-yanews.settings_test}"
+YANOTE_SETTINGS="${YANOTE_SETTINGS:-yanote.settings_test}"
+
+# При наличии pytest-xdist и нескольких ядер тесты делятся между процессами,
+# у каждого процесса своя тестовая база.
+PYTEST_ARGS=(--tb=line)
+if python -c "import os, xdist; exit(os.cpu_count() < 2)" 2>/dev/null; then
+    PYTEST_ARGS+=(-n auto)
+fi
+
+LOG_DIR=$(mktemp -d)
+trap 'rm -rf "$LOG_DIR"' EXIT
+
+run_suite () {
+    # Run pytest for the project (first argument) with the settings module
+    # (second argument) and save its output to the log directory.
+    (cd "$1" && pytest --ds="$2" "${PYTEST_ARGS[@]}" >"$LOG_DIR/$1.log" 2>&1)
+}
+
+
 if python -m flake8 --config=setup.cfg 1>&2;
 then
     print_message " flake8 завершил проверку кода, ошибок не обнаружено " "="
     echo $LF 1>&2
     if python structure_test.py
     then
-        cd ya_news
-        export DJANGO_SETTINGS_MODULE="${DJANGO_SETTINGS_MODULE:="yanews.settings"}"
-        if pytest --tb=line 1>&2;
-        then
-            cd ../ya_note
-            unset DJANGO_SETTINGS_MODULE
-            export DJANGO_SETTINGS_MODULE="${DJANGO_SETTINGS_MODULE:="yanote.settings"}"
-            if pytest --tb=line 1>&2;
-            then
-                exit 0
-            else
-                status=$?
-                print_message " При запуске упали ваши тесты для проекта YaNote. Проверьте тесты этого проекта " "=" 1
-                echo \`\`\` 1>&2
-                exit $status
-            fi
-        else
-            status=$?
+        # Проекты тестируются одновременно.
+        run_suite ya_news "$YANEWS_SETTINGS" &
+        news_pid=$!
+        run_suite ya_note "$YANOTE_SETTINGS" &
+        note_pid=$!
+        wait $news_pid
+        news_status=$?
+        wait $note_pid
+        note_status=$?
+        cat "$LOG_DIR/ya_news.log" "$LOG_DIR/ya_note.log" 1>&2
+        if [[ $news_status -ne 0 ]]; then
             print_message " При запуске упали ваши тесты для проекта YaNews. Проверьте тесты этого проекта " "=" 1
             echo \`\`\` 1>&2
-            exit $status
+            exit $news_status
+        fi
+        if [[ $note_status -ne 0 ]]; then
+            print_message " При запуске упали ваши тесты для проекта YaNote. Проверьте тесты этого проекта " "=" 1
+            echo \`\`\` 1>&2
+            exit $note_status
         fi
+        exit 0
     else
         status=$?
         print_message " Убедитесь, что написанные вами тесты скопированы в указанные в ТЗ директории " "=" 1
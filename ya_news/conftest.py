@@ -1,16 +1,85 @@
 import pytest
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.utils import timezone
 
 from news.models import News, Comment
 from news.forms import BAD_WORDS
+from news.pytest_tests.factories import (
+    CommentFactory, NewsFactory, reset_sequences
+)
+from yanews.profiling import QueryRecorder
+
+COMMENTS_PER_POPULAR_NEWS = 10_000
+AUTHOR_USERNAME = 'Автор'
+# Реплика для тестов чтения с реплик: отдельная тестовая база,
+# которую наполняет news.routers.sync_replicas.
+REPLICA_ALIAS = 'replica'
+settings.DATABASES.setdefault(REPLICA_ALIAS, {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': ':memory:',
+})
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    """
+    Пользователи, нужные почти каждому тесту, создаются раз за сессию.
+
+    Тесты работают внутри откатываемых транзакций и эти строки не меняют.
+    Суперпользователь тот же, что ищет фикстура admin_user, поэтому
+    пароль хешируется один раз, а не в каждом тесте с admin_client.
+    Если тест с transaction=True очистит базу, фикстуры создадут
+    пользователей заново.
+    """
+    with django_db_blocker.unblock():
+        User = get_user_model()
+        User.objects.create(username=AUTHOR_USERNAME)
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_factory_sequences():
+    reset_sequences()
+
+
+@pytest.fixture
+def assert_budget():
+    """
+    Запрашивает страницу и проверяет лимиты на SQL-запросы и размер ответа.
+
+    При превышении лимита запросов выводит их SQL по местам вызова.
+    """
+    def check(client, url, max_queries, max_bytes):
+        recorder = QueryRecorder(record_callsites=True)
+        with connection.execute_wrapper(recorder):
+            response = client.get(url)
+        assert recorder.count <= max_queries, (
+            f'{url}: {recorder.count} SQL-запросов при лимите '
+            f'{max_queries}\n{recorder.format_queries()}'
+        )
+        size = len(response.content)
+        assert size <= max_bytes, (
+            f'{url}: ответ {size} байт при лимите {max_bytes}'
+        )
+        return response
+    return check
 
 
 @pytest.fixture
 def author(django_user_model):
-    return django_user_model.objects.create(username='Автор')
+    return django_user_model.objects.get_or_create(
+        username=AUTHOR_USERNAME
+    )[0]
 
 
 @pytest.fixture
@@ -26,16 +95,16 @@ def news():
 
 @pytest.fixture
 def all_news():
-    today = datetime.today()
-    all_news = [
-        News(
-            title=f'Новость {index}',
-            text='Просто текст.',
-            date=today - timedelta(days=index),
-        )
-        for index in range(settings.NEWS_COUNT_ON_HOME_PAGE + 1)
-    ]
-    return News.objects.bulk_create(all_news)
+    return NewsFactory().create_batch(settings.NEWS_COUNT_ON_HOME_PAGE + 1)
+
+
+@pytest.fixture
+def all_news_with_comments(all_news, author):
+    """Новости для главной страницы, у каждой много комментариев."""
+    CommentFactory().fill(
+        News.objects.all(), author, COMMENTS_PER_POPULAR_NEWS
+    )
+    return all_news
 
 
 @pytest.fixture
@@ -49,11 +118,12 @@ def comment(news, author):
 def two_comments(news, author):
     now = timezone.now()
     for index in range(2):
-        comment = Comment.objects.create(
-            news=news, author=author, text=f'Tекст {index}',
+        Comment.objects.create(
+            news=news,
+            author=author,
+            text=f'Tекст {index}',
+            created=now + timedelta(days=index),
         )
-        comment.created = now + timedelta(days=index)
-        comment.save()
     return Comment.objects.all()
 
 
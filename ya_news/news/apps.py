@@ -1,7 +1,32 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
 
 
 class NewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'news'
     verbose_name = 'Новости'
+
+    def ready(self):
+        from .database import (
+            check_connections, configure_sqlite, mark_reused_connections
+        )
+        from .models import Comment, News
+        from .signals import (
+            comment_deleted, comment_deleting, comment_saved, fill_modified,
+            news_changed
+        )
+
+        connection_created.connect(configure_sqlite)
+        request_started.connect(check_connections)
+        request_finished.connect(mark_reused_connections)
+        pre_save.connect(fill_modified, sender=News)
+        post_save.connect(news_changed, sender=News)
+        post_delete.connect(news_changed, sender=News)
+        post_save.connect(comment_saved, sender=Comment)
+        pre_delete.connect(comment_deleting, sender=Comment)
+        post_delete.connect(comment_deleted, sender=Comment)
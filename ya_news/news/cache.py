@@ -0,0 +1,29 @@
+"""Версия кэша главной страницы."""
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+HOME_PAGE_VERSION_KEY = 'news:home:version'
+
+
+def get_home_page_version():
+    """
+    Текущая версия списка новостей на главной.
+
+    Версия входит в ключ кэшированного фрагмента, поэтому после
+    её смены главная страница сразу отрисовывается заново.
+    """
+    version = cache.get(HOME_PAGE_VERSION_KEY)
+    if version is None:
+        cache.add(HOME_PAGE_VERSION_KEY, uuid4().hex, None)
+        version = cache.get(HOME_PAGE_VERSION_KEY)
+    return version
+
+
+def invalidate_home_page(using=None):
+    """Сбрасывает кэш главной после фиксации текущей транзакции."""
+    transaction.on_commit(
+        lambda: cache.set(HOME_PAGE_VERSION_KEY, uuid4().hex, None),
+        using=using,
+    )
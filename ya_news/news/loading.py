@@ -0,0 +1,320 @@
+"""
+Потоковая загрузка новостей и комментариев из JSON Lines или CSV.
+
+Файл читается построчно и вставляется пачками через bulk_create,
+каждая пачка — в своей транзакции, поэтому память не растёт
+с размером файла. Разбор файла (detect_format, read_rows) совпадает
+с notes/bulk.py в YaNote, почему — см. README.
+"""
+import csv
+import json
+from collections import Counter, OrderedDict
+from datetime import date
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import invalidate_home_page
+from .models import Comment, News
+from .pagination import MAX_PK
+
+FORMATS = ('jsonl', 'csv')
+MODELS = ('news', 'comments')
+BATCH_SIZE = 5000
+AUTHOR_CACHE_SIZE = 10_000
+
+
+def detect_format(filename):
+    """Формат файла по расширению, по умолчанию JSON Lines."""
+    return 'csv' if str(filename).lower().endswith('.csv') else 'jsonl'
+
+
+class ImportFileError(Exception):
+    """Файл нельзя разобрать целиком: он не в UTF-8 или это не CSV."""
+
+
+def read_rows(lines, file_format):
+    """
+    Построчно разбирает файл.
+
+    Возвращает пары (номер строки, словарь полей); вместо словаря
+    для нечитаемой строки возвращается текст ошибки. Если дальше
+    читать файл нельзя, выбрасывается ImportFileError.
+    """
+    try:
+        if file_format == 'csv':
+            yield from _read_csv(lines)
+        else:
+            yield from _read_jsonl(lines)
+    except UnicodeDecodeError as error:
+        raise ImportFileError(f'Файл не в кодировке UTF-8: {error}')
+
+
+def _read_csv(lines):
+    reader = csv.DictReader(lines)
+    try:
+        for row in reader:
+            yield reader.line_num, row
+    except csv.Error as error:
+        raise ImportFileError(
+            f'Некорректный CSV в строке {reader.line_num}: {error}'
+        )
+
+
+def _read_jsonl(lines):
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield line_number, f'Некорректный JSON: {error}'
+            continue
+        if not isinstance(row, dict):
+            yield line_number, 'Ожидался JSON-объект.'
+            continue
+        yield line_number, row
+
+
+class LoadResult:
+    """Итог загрузки: число созданных строк и ошибки по строкам."""
+
+    def __init__(self, on_error=None, on_batch=None):
+        self.rows = 0
+        self.created = 0
+        self.errors = 0
+        self.on_error = on_error
+        self.on_batch = on_batch
+
+    def add_error(self, line_number, message):
+        """Считает ошибку и сразу передаёт её в on_error, не накапливая."""
+        self.errors += 1
+        if self.on_error is not None:
+            self.on_error({'line': line_number, 'error': message})
+
+    def add_batch(self, rows, created):
+        self.rows += rows
+        self.created += created
+        if self.on_batch is not None:
+            self.on_batch(self)
+
+
+class AuthorCache:
+    """
+    Соответствие username → id с вытеснением давно не нужных записей.
+
+    Неизвестные имена запрашиваются одним запросом на пачку.
+    """
+
+    def __init__(self, max_size=AUTHOR_CACHE_SIZE):
+        self.max_size = max_size
+        self.ids = OrderedDict()
+
+    def resolve(self, usernames):
+        missing = {
+            username for username in usernames if username not in self.ids
+        }
+        found = dict(get_user_model().objects.filter(
+            username__in=missing
+        ).values_list('username', 'id')) if missing else {}
+        result = {}
+        for username in usernames:
+            if username in found:
+                self.ids[username] = found[username]
+            if username in self.ids:
+                self.ids.move_to_end(username)
+                result[username] = self.ids[username]
+        while len(self.ids) > self.max_size:
+            self.ids.popitem(last=False)
+        return result
+
+
+def load_news(rows, batch_size=BATCH_SIZE, result=None):
+    """
+    Создаёт новости из строк read_rows пачками.
+
+    Необязательное поле id позволяет потом загрузить комментарии
+    к этим новостям; занятые id отбрасываются одним запросом на пачку.
+    """
+    result = result or LoadResult()
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        news = [
+            item for item in (
+                _build_news(line_number, row, result)
+                for line_number, row in batch
+            )
+            if item is not None
+        ]
+        news = _skip_taken_ids(news, result)
+        with transaction.atomic():
+            News.objects.bulk_create(item for _, item in news)
+            invalidate_home_page()
+        result.add_batch(len(batch), len(news))
+    return result
+
+
+def parse_id(value):
+    """
+    Id из поля файла: целое число от 1 до MAX_PK.
+
+    Иначе ValueError, а не OverflowError драйвера базы при запросе
+    с этим id.
+    """
+    pk = int(str(value))
+    if not 0 < pk <= MAX_PK:
+        raise ValueError(f'Id вне допустимых пределов: {pk}')
+    return pk
+
+
+def _build_news(line_number, row, result):
+    if isinstance(row, str):
+        result.add_error(line_number, row)
+        return None
+    pk = None
+    if row.get('id'):
+        try:
+            pk = parse_id(row['id'])
+        except ValueError:
+            result.add_error(
+                line_number, {'id': [f'Некорректный id: {row["id"]}.']}
+            )
+            return None
+    news = News(
+        pk=pk,
+        title=str(row.get('title') or ''),
+        text=str(row.get('text') or ''),
+    )
+    try:
+        if row.get('date'):
+            news.date = date.fromisoformat(str(row['date']))
+        news.full_clean(validate_unique=False)
+    except ValueError as error:
+        result.add_error(line_number, {'date': [str(error)]})
+        return None
+    except ValidationError as error:
+        result.add_error(line_number, error.message_dict)
+        return None
+    return line_number, news
+
+
+def _skip_taken_ids(news, result):
+    taken = set(News.objects.filter(
+        pk__in=[item.pk for _, item in news if item.pk is not None]
+    ).values_list('pk', flat=True))
+    free = []
+    for line_number, item in news:
+        if item.pk in taken:
+            result.add_error(
+                line_number, {'id': [f'Новость {item.pk} уже существует.']}
+            )
+            continue
+        if item.pk is not None:
+            taken.add(item.pk)
+        free.append((line_number, item))
+    return free
+
+
+def load_comments(rows, batch_size=BATCH_SIZE, result=None):
+    """
+    Добавляет комментарии к существующим новостям пачками.
+
+    Автор задаётся по username, счётчики и дата изменения новостей
+    обновляются в той же транзакции, что и вставка пачки.
+    """
+    result = result or LoadResult()
+    authors = AuthorCache()
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        parsed = []
+        for line_number, row in batch:
+            if isinstance(row, str):
+                result.add_error(line_number, row)
+            else:
+                parsed.append((line_number, row))
+        author_ids = authors.resolve({
+            str(row.get('author') or '') for _, row in parsed
+        })
+        news_ids = set(News.objects.filter(pk__in={
+            news_id for news_id in (_news_id(row) for _, row in parsed)
+            if news_id is not None
+        }).values_list('pk', flat=True))
+        comments = [
+            comment for comment in (
+                _build_comment(line_number, row, author_ids, news_ids, result)
+                for line_number, row in parsed
+            )
+            if comment is not None
+        ]
+        with transaction.atomic():
+            Comment.objects.bulk_create(comments)
+            _touch_news(Counter(comment.news_id for comment in comments))
+        result.add_batch(len(batch), len(comments))
+    return result
+
+
+def _news_id(row):
+    try:
+        return parse_id(row.get('news') or '')
+    except ValueError:
+        return None
+
+
+def _build_comment(line_number, row, author_ids, news_ids, result):
+    news_id = _news_id(row)
+    if news_id not in news_ids:
+        result.add_error(line_number, {
+            'news': [f'Новость {row.get("news") or ""} не найдена.']
+        })
+        return None
+    author = str(row.get('author') or '')
+    if author not in author_ids:
+        result.add_error(
+            line_number, {'author': [f'Пользователь {author} не найден.']}
+        )
+        return None
+    comment = Comment(
+        news_id=news_id,
+        author_id=author_ids[author],
+        text=str(row.get('text') or ''),
+    )
+    if row.get('created'):
+        try:
+            created = parse_datetime(str(row['created']))
+        except ValueError:
+            created = None
+        if created is None:
+            result.add_error(
+                line_number, {'created': ['Некорректная дата.']}
+            )
+            return None
+        if timezone.is_naive(created):
+            created = timezone.make_aware(created)
+        comment.created = created
+    try:
+        comment.full_clean(exclude=('news', 'author'))
+    except ValidationError as error:
+        result.add_error(line_number, error.message_dict)
+        return None
+    return comment
+
+
+def _touch_news(counts):
+    """Увеличивает счётчики новостей одним UPDATE на каждое приращение."""
+    if not counts:
+        return
+    news_by_delta = {}
+    for news_id, delta in counts.items():
+        news_by_delta.setdefault(delta, []).append(news_id)
+    now = timezone.now()
+    for delta, news_ids in news_by_delta.items():
+        News.objects.filter(pk__in=news_ids).update(
+            comment_count=F('comment_count') + delta,
+            modified=now,
+        )
+    invalidate_home_page()
@@ -0,0 +1,54 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news.loading import (
+    BATCH_SIZE, FORMATS, MODELS, ImportFileError, LoadResult, detect_format,
+    load_comments, load_news, read_rows
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает новости или комментарии к существующим '
+        'новостям из файла JSON Lines или CSV.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--model', choices=MODELS, default='news')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or detect_format(options['path'])
+        load = load_news if options['model'] == 'news' else load_comments
+        started = time.perf_counter()
+
+        def report_error(error):
+            self.stderr.write(json.dumps(error, ensure_ascii=False))
+
+        def report_batch(result):
+            if options['verbosity'] > 1:
+                self.stdout.write(self.progress(result, started))
+
+        with open(options['path'], encoding='utf-8', newline='') as file:
+            try:
+                result = load(
+                    read_rows(file, file_format),
+                    batch_size=options['batch_size'],
+                    result=LoadResult(report_error, report_batch),
+                )
+            except ImportFileError as error:
+                # Пачки до ошибки уже сохранены.
+                raise CommandError(f'Загрузка прервана: {error}')
+        self.stdout.write(self.progress(result, started))
+
+    def progress(self, result, started):
+        duration = time.perf_counter() - started
+        return (
+            f'Прочитано строк: {result.rows}, создано: {result.created}, '
+            f'ошибок: {result.errors}, за {duration:.1f} с '
+            f'({result.rows / max(duration, 1e-9):.0f} строк/с)'
+        )
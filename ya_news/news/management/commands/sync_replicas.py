@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from news.routers import sync_replicas
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в реплики NEWS_READ_REPLICAS.'
+
+    def handle(self, *args, **options):
+        sync_replicas()
+        self.stdout.write(
+            f'Обновлено реплик: {len(settings.NEWS_READ_REPLICAS)}'
+        )
@@ -1,16 +1,54 @@
 from datetime import datetime
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import invalidate_home_page
+
+
+class NewsQuerySet(models.QuerySet):
+
+    def recount_comments(self, **fields):
+        """
+        Пересчитывает счётчики комментариев одним UPDATE.
+
+        fields — другие поля, которые нужно обновить тем же запросом.
+        """
+        comment_count = Comment.objects.filter(
+            news=OuterRef('pk')
+        ).order_by().values('news').annotate(
+            count=Count('pk')
+        ).values('count')
+        invalidate_home_page(using=self.db)
+        return self.update(
+            comment_count=Coalesce(Subquery(comment_count), 0), **fields
+        )
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    modified = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
+
+    objects = NewsQuerySet.as_manager()
 
     class Meta:
         ordering = ('-date',)
+        indexes = (
+            models.Index(fields=('-date',), name='news_date_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
@@ -28,10 +66,26 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
     )
     text = models.TextField()
-    created = models.DateTimeField(auto_now_add=True)
+    created = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет комментарий в транзакции.
+
+        Обработчик post_save (news.signals) обновляет новость в той же
+        транзакции: Model.save отправляет сигнал уже вне своего блока.
+        """
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
@@ -0,0 +1,129 @@
+"""Поиск запрещённых слов в тексте комментариев."""
+import os
+import re
+import threading
+
+from django.conf import settings
+
+END_OF_WORD = ''
+NOT_LOADED = object()
+
+
+def build_trie(words):
+    """Префиксное дерево слов: словари по буквам, END_OF_WORD — конец слова."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[END_OF_WORD] = {}
+    return trie
+
+
+def build_pattern(trie):
+    """
+    Собирает дерево в одно регулярное выражение.
+
+    Общие префиксы слов проверяются один раз, поэтому время поиска
+    почти не зависит от размера словаря. Выражение — опережающая
+    проверка нулевой ширины: оно находит каждую позицию, с которой
+    начинается хотя бы одно слово, в том числе внутри другого вхождения.
+    """
+    return re.compile('(?=' + _node_pattern(trie) + ')') if trie else None
+
+
+def iter_words(trie, text, start):
+    """Все слова дерева, которые начинаются в text с позиции start."""
+    node = trie
+    for end in range(start, len(text)):
+        node = node.get(text[end])
+        if node is None:
+            return
+        if END_OF_WORD in node:
+            yield text[start:end + 1]
+
+
+def _node_pattern(node):
+    branches = [
+        re.escape(char) + _node_pattern(child)
+        for char, child in sorted(node.items())
+        if char != END_OF_WORD
+    ]
+    if not branches:
+        return ''
+    if END_OF_WORD in node:
+        return '(?:' + '|'.join(branches) + ')?'
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')'
+
+
+def read_words(path):
+    """Слова из файла: по одному в строке, # — комментарий."""
+    with open(path, encoding='utf-8') as file:
+        return [
+            line.strip().lower() for line in file
+            if line.strip() and not line.startswith('#')
+        ]
+
+
+class BadWordsMatcher:
+    """
+    Скомпилированный словарь запрещённых слов.
+
+    Словарь берётся из файла settings.BAD_WORDS_FILE, а если он не задан
+    или не читается — из слов, переданных при создании. Файл
+    перечитывается, как только меняется время его изменения, так что
+    словарь обновляется без перезапуска сервера.
+    """
+
+    def __init__(self, default_words):
+        self.default_words = tuple(word.lower() for word in default_words)
+        self._lock = threading.Lock()
+        self._source = NOT_LOADED
+        self._compiled = {}, None
+
+    def find_all(self, text):
+        """
+        Все вхождения запрещённых слов за один проход по тексту.
+
+        Перекрывающиеся вхождения тоже попадают в ответ: для «редиска»
+        это и «редис», и «редиска». Слова идут по позиции начала,
+        а с одной позиции — от короткого к длинному.
+        """
+        trie, pattern = self._get_compiled()
+        if pattern is None:
+            return []
+        text = text.lower()
+        return [
+            word for match in pattern.finditer(text)
+            for word in iter_words(trie, text, match.start())
+        ]
+
+    def _get_compiled(self):
+        source = self._get_source()
+        if source != self._source:
+            with self._lock:
+                if source != self._source:
+                    trie = build_trie(self._read_words(source))
+                    self._compiled = trie, build_pattern(trie)
+                    self._source = source
+        return self._compiled
+
+    def _get_source(self):
+        """Путь к файлу словаря и время его изменения или None."""
+        path = getattr(settings, 'BAD_WORDS_FILE', None)
+        if not path:
+            return None
+        try:
+            return path, os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_words(self, source):
+        if source is None:
+            return self.default_words
+        try:
+            return read_words(source[0])
+        except (OSError, UnicodeDecodeError):
+            return self.default_words
@@ -0,0 +1,70 @@
+"""
+Уведомления о новых комментариях внутри процесса.
+
+NewsComment после фиксации транзакции вызывает notify_new_comment,
+и запросы, ждущие новых комментариев (long-polling), просыпаются без
+опроса базы в цикле. Ждущий запрос — корутина: он держит только
+asyncio.Event в своём цикле событий, а не поток, поэтому под ASGI
+не занимает общий поток синхронных страниц. Уведомление приходит из
+потока, где выполнялась запись, и передаётся в цикл ждущего через
+call_soon_threadsafe.
+
+Уведомления не выходят за пределы процесса: комментарий, добавленный
+другим процессом сервера, ждущий запрос увидит после таймаута, когда
+клиент повторит запрос.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+_lock = threading.Lock()
+_versions = defaultdict(int)
+# Ждущие запросы по новостям: пары (цикл событий, asyncio.Event).
+_waiters = defaultdict(set)
+
+
+def get_comments_version(news_id):
+    """Номер последнего уведомления по новости."""
+    with _lock:
+        return _versions[news_id]
+
+
+def notify_new_comment(news_id, using=None):
+    """Будит ждущие запросы после фиксации текущей транзакции."""
+    def notify():
+        with _lock:
+            _versions[news_id] += 1
+            waiters = list(_waiters.get(news_id, ()))
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Цикл уже закрыт: запрос перестал ждать по таймауту.
+                pass
+
+    transaction.on_commit(notify, using=using)
+
+
+async def wait_for_comments(news_id, version, timeout):
+    """
+    Ждёт уведомления по новости новее version не дольше timeout секунд.
+
+    Возвращает False, если время вышло.
+    """
+    waiter = (asyncio.get_running_loop(), asyncio.Event())
+    with _lock:
+        if _versions[news_id] != version:
+            return True
+        _waiters[news_id].add(waiter)
+    try:
+        await asyncio.wait_for(waiter[1].wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        with _lock:
+            _waiters[news_id].discard(waiter)
+            if not _waiters[news_id]:
+                del _waiters[news_id]
@@ -0,0 +1,71 @@
+"""Курсорная (keyset) пагинация комментариев к новости."""
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from .models import Comment
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+CURSOR_SEPARATOR = '_'
+# Наибольший первичный ключ BigAutoField.
+MAX_PK = 2 ** 63 - 1
+
+
+def encode_cursor(comment):
+    """Курсор — время создания в микросекундах и id комментария."""
+    microseconds = (comment.created - EPOCH) // MICROSECOND
+    return f'{microseconds}{CURSOR_SEPARATOR}{comment.pk}'
+
+
+def decode_cursor(cursor):
+    """
+    Разбирает курсор, при неверном формате выбрасывает ValueError.
+
+    Значения вне допустимых пределов тоже дают ValueError, а не
+    OverflowError от datetime или драйвера базы.
+    """
+    microseconds, pk = cursor.split(CURSOR_SEPARATOR)
+    pk = int(pk)
+    if not 0 <= pk <= MAX_PK:
+        raise ValueError(f'Id вне допустимых пределов: {pk}')
+    try:
+        return EPOCH + int(microseconds) * MICROSECOND, pk
+    except OverflowError as error:
+        raise ValueError(f'Время вне допустимых пределов: {error}')
+
+
+def get_page_size(value=None):
+    """Размер страницы из запроса, ограниченный настройками проекта."""
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        return settings.COMMENTS_COUNT_ON_NEWS_PAGE
+    return max(1, min(page_size, settings.COMMENTS_MAX_PAGE_SIZE))
+
+
+def get_comments_page(news, cursor=None, page_size=None):
+    """
+    Возвращает страницу комментариев и курсор следующей страницы.
+
+    Комментарии идут в порядке (created, id); следующая страница
+    начинается строго после курсора, поэтому стоимость запроса
+    не зависит от того, насколько далеко пролистано обсуждение.
+    Если страница последняя, вместо курсора возвращается None.
+    Вместо объекта автора у комментария есть только author_name.
+    """
+    page_size = page_size or settings.COMMENTS_COUNT_ON_NEWS_PAGE
+    queryset = Comment.objects.filter(news=news).annotate(
+        author_name=F('author__username')
+    ).order_by('created', 'pk')
+    if cursor:
+        created, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created__gt=created) | Q(created=created, pk__gt=pk)
+        )
+    comments = list(queryset[:page_size + 1])
+    if len(comments) <= page_size:
+        return comments, None
+    comments = comments[:page_size]
+    return comments, encode_cursor(comments[-1])
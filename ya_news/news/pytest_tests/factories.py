@@ -0,0 +1,191 @@
+"""
+Фабрики тестовых данных YaNews.
+
+Объекты с правдоподобным текстом и датами вставляются пачками через
+bulk_create. Содержимое зависит только от seed, а номер объекта общий
+для всех фабрик модели, чтобы имена пользователей не повторялись.
+Нумерация начинается заново в каждом тесте (reset_sequences), поэтому
+данные теста не зависят от того, какие тесты выполнялись до него.
+Фабрики используют и тесты, и бенчмарки.
+"""
+import random
+from collections import Counter
+from datetime import date, timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.utils import timezone
+
+from news.cache import invalidate_home_page
+from news.models import Comment, News
+
+BATCH_SIZE = 5000
+TITLE_MAX_LENGTH = News._meta.get_field('title').max_length
+WORDS = (
+    'город', 'новость', 'жители', 'погода', 'дорога', 'мост', 'школа',
+    'парк', 'выставка', 'концерт', 'команда', 'матч', 'сезон', 'проект',
+    'вечер', 'утро', 'неделя', 'праздник', 'открыли', 'построили',
+    'обсудили', 'сообщили', 'ожидают', 'новый', 'большой', 'местный',
+    'первый', 'главный', 'рядом', 'сегодня', 'завтра', 'снова',
+)
+
+# Номер следующего объекта каждой модели.
+sequences = Counter()
+
+
+def reset_sequences(numbers=None):
+    """Начинает нумерацию заново или с сохранённых номеров."""
+    sequences.clear()
+    sequences.update(numbers or {})
+
+
+class Factory:
+    """
+    Базовая фабрика.
+
+    Значение поля, переданное в build или create_batch, может быть
+    функцией от номера объекта в этом вызове.
+    """
+    model = None
+    # after_insert нуждается в первичных ключах вставленных объектов.
+    needs_pks = False
+
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+
+    def fields(self, number):
+        """Значения полей по умолчанию для объекта с номером number."""
+        return {}
+
+    def sentence(self, words=8):
+        text = ' '.join(self.random.choices(WORDS, k=words))
+        return text.capitalize() + '.'
+
+    def text(self, sentences=3):
+        return ' '.join(
+            self.sentence(self.random.randint(4, 12))
+            for _ in range(sentences)
+        )
+
+    def build(self, index=0, **fields):
+        """Несохранённый объект."""
+        number = sequences[self.model]
+        sequences[self.model] += 1
+        values = self.fields(number)
+        values.update(
+            (name, value(index) if callable(value) else value)
+            for name, value in fields.items()
+        )
+        return self.model(**values)
+
+    def iter_create(self, amount, batch_size=BATCH_SIZE, fetch=True,
+                    **fields):
+        """Вставляет объекты пачками и отдаёт каждую сохранённую пачку."""
+        objs = (self.build(index, **fields) for index in range(amount))
+        while batch := list(islice(objs, batch_size)):
+            yield self.insert(batch, fetch)
+
+    def create_batch(self, amount, **fields):
+        """Вставляет amount объектов и возвращает их с первичными ключами."""
+        return [
+            obj for batch in self.iter_create(amount, **fields)
+            for obj in batch
+        ]
+
+    def create_many(self, amount, **fields):
+        """Как create_batch, но не держит созданные объекты в памяти."""
+        for _ in self.iter_create(amount, fetch=False, **fields):
+            pass
+
+    def create(self, **fields):
+        return self.create_batch(1, **fields)[0]
+
+    def insert(self, objs, fetch=True):
+        """
+        Вставляет пачку через bulk_create.
+
+        SQLite не возвращает первичные ключи вставленных строк, поэтому
+        при необходимости пачка перечитывается по диапазону ключей.
+        """
+        manager = self.model.objects
+        last_pk = manager.order_by('-pk').values_list('pk', flat=True).first()
+        manager.bulk_create(objs)
+        if (fetch or self.needs_pks) and objs[0].pk is None:
+            objs = list(
+                manager.filter(pk__gt=last_pk or 0).order_by('pk')
+            )
+        self.after_insert(objs)
+        return objs
+
+    def after_insert(self, objs):
+        """Обновляет то, что при обычном save() обновили бы модели."""
+
+
+class UserFactory(Factory):
+    model = get_user_model()
+    password = make_password(None)
+
+    def fields(self, number):
+        return {'username': f'user{number}', 'password': self.password}
+
+
+class NewsFactory(Factory):
+    model = News
+
+    def fields(self, number):
+        return {
+            'title': self.sentence(4)[:TITLE_MAX_LENGTH],
+            'text': self.text(),
+            'date': date.today() - timedelta(days=self.random.randrange(365)),
+        }
+
+    def after_insert(self, objs):
+        invalidate_home_page()
+
+
+class CommentFactory(Factory):
+    """Комментарии; news и author нужно передать явно."""
+    model = Comment
+
+    def fields(self, number):
+        return {
+            'text': self.sentence(self.random.randint(3, 20)),
+            'created': timezone.now() - timedelta(
+                seconds=self.random.randrange(30 * 24 * 60 * 60)
+            ),
+        }
+
+    def after_insert(self, objs):
+        News.objects.filter(
+            pk__in={comment.news_id for comment in objs}
+        ).recount_comments()
+
+    def fill(self, news, author, per_news):
+        """
+        Добавляет по per_news комментариев автора к каждой новости.
+
+        Строки порождает сама база одним INSERT ... SELECT, без объектов
+        Python, поэтому сотни тысяч комментариев вставляются за доли
+        секунды. Текст у таких комментариев простой: «Комментарий N».
+        """
+        news = news.order_by()
+        with connection.cursor() as cursor:
+            news_sql, news_params = news.values('pk').query.sql_with_params()
+            cursor.execute(
+                'WITH RECURSIVE seq(n) AS ('
+                'SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n + 1 < %s) '
+                f'INSERT INTO {Comment._meta.db_table} '
+                '(news_id, author_id, text, created) '
+                'SELECT news.id, %s, %s || seq.n, %s '
+                f'FROM ({news_sql}) news, seq',
+                [
+                    per_news,
+                    author.pk,
+                    'Комментарий ',
+                    connection.ops.adapt_datetimefield_value(timezone.now()),
+                    *news_params,
+                ],
+            )
+        news.recount_comments()
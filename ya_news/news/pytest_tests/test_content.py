@@ -1,8 +1,29 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+from http import HTTPStatus
+from urllib.parse import urlencode
+
 import pytest
 
+from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import AsyncClient, AsyncRequestFactory, Client
 from django.urls import reverse
 
+from conftest import COMMENTS_PER_POPULAR_NEWS, REPLICA_ALIAS
+from news import async_views
+from news.models import Comment, News
+from news.pagination import encode_cursor
+from news.routers import STICKY_COOKIE, sync_replicas
+from yanews.profiling import QueryRecorder, record_queries
+
+HOME_PAGE_MAX_QUERIES = 1
+HOME_PAGE_MAX_MEMORY = 2 * 1024 * 1024
+
 
 @pytest.mark.django_db
 def test_news_count(client, all_news):
@@ -23,6 +44,27 @@ def test_news_order(client, all_news):
     assert all_dates == sorted_dates
 
 
+@pytest.mark.django_db
+def test_home_page_does_not_load_comments(
+    client, all_news_with_comments, django_assert_max_num_queries
+):
+    url = reverse('news:home')
+    tracemalloc.start()
+    try:
+        with django_assert_max_num_queries(HOME_PAGE_MAX_QUERIES):
+            response = client.get(url)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak_memory < HOME_PAGE_MAX_MEMORY
+    comment_counts = {
+        news.comment_count for news in response.context['object_list']
+    }
+    assert comment_counts == {COMMENTS_PER_POPULAR_NEWS}
+    content = response.content.decode()
+    assert f'Комментариев: {COMMENTS_PER_POPULAR_NEWS}' in content
+
+
 def test_comments_order(author_client, news, two_comments):
     url = reverse('news:detail', args=(news.id,))
     response = author_client.get(url)
@@ -32,6 +74,22 @@ def test_comments_order(author_client, news, two_comments):
     assert all_comments[0].created < all_comments[1].created
 
 
+def test_comment_links_only_for_owned_comments(
+    author_client, news, comment, admin_user
+):
+    foreign_comment = Comment.objects.create(
+        news=news, author=admin_user, text='Чужой комментарий'
+    )
+    response = author_client.get(reverse('news:detail', args=(news.id,)))
+    assert response.context['owned_comment_ids'] == {comment.pk}
+    for item in response.context['comments']:
+        assert not Comment.author.is_cached(item)
+    content = response.content.decode()
+    assert reverse('news:edit', args=(comment.pk,)) in content
+    assert reverse('news:edit', args=(foreign_comment.pk,)) not in content
+    assert admin_user.username in content
+
+
 @pytest.mark.django_db
 def test_anonymous_client_has_no_form(client, news):
     url = reverse('news:detail', args=(news.id,))
@@ -43,3 +101,237 @@ def test_authorized_client_has_form(admin_client, news):
     url = reverse('news:detail', args=(news.id,))
     response = admin_client.get(url)
     assert 'form' in response.context
+
+
+@pytest.mark.django_db
+def test_comments_are_paginated_by_cursor(
+    client, news, two_comments, settings
+):
+    settings.COMMENTS_COUNT_ON_NEWS_PAGE = 1
+    first_comment, second_comment = two_comments
+    response = client.get(reverse('news:detail', args=(news.id,)))
+    assert response.context['comments'] == [first_comment]
+    next_cursor = response.context['next_cursor']
+    assert next_cursor
+    url = reverse('news:comments', args=(news.id,))
+    response = client.get(url, {'cursor': next_cursor})
+    assert response.context['comments'] == [second_comment]
+    assert response.context['next_cursor'] is None
+
+
+@pytest.mark.django_db
+def test_load_more_link_keeps_page_size(client, news, two_comments):
+    response = client.get(
+        reverse('news:detail', args=(news.id,)), {'limit': 1}
+    )
+    next_url = (
+        reverse('news:comments', args=(news.id,))
+        + f'?cursor={response.context["next_cursor"]}&amp;limit=1'
+    )
+    assert next_url in response.content.decode()
+
+
+# news:comments_since читает базу в пуле потоков, поэтому данным теста
+# нужна зафиксированная транзакция.
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize(
+    'cursor',
+    (
+        'not-a-cursor',
+        '99999999999999999999_1',
+        '-99999999999999999999_1',
+        '1_99999999999999999999',
+    )
+)
+def test_comments_page_rejects_invalid_cursor(client, news, cursor):
+    for name in ('news:comments', 'news:comments_since'):
+        response = client.get(reverse(name, args=(news.id,)), {
+            'cursor': cursor
+        })
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.django_db(transaction=True)
+def test_comments_since_returns_only_newer_comments(
+    client, news, two_comments
+):
+    first_comment, second_comment = two_comments
+    url = reverse('news:comments_since', args=(news.id,))
+    data = client.get(url, {'cursor': encode_cursor(first_comment)}).json()
+    assert [comment['id'] for comment in data['comments']] == [
+        second_comment.pk
+    ]
+    assert data['cursor'] == encode_cursor(second_comment)
+    assert data['has_more'] is False
+    started = time.monotonic()
+    data = client.get(url, {'cursor': data['cursor'], 'wait': 0.1}).json()
+    assert time.monotonic() - started >= 0.1
+    assert data == {
+        'comments': [], 'cursor': encode_cursor(second_comment),
+        'has_more': False,
+    }
+    response = client.get(url, {'cursor': 'not-a-cursor'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    url = reverse('news:comments_since', args=(news.id + 1,))
+    assert client.get(url).status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.django_db(transaction=True)
+def test_comments_since_wakes_up_on_new_comment(client, news, author):
+    def post_comment():
+        time.sleep(0.2)
+        author_client = Client()
+        author_client.force_login(author)
+        author_client.post(
+            reverse('news:detail', args=(news.id,)),
+            {'text': 'Свежий комментарий'},
+        )
+        connection.close()
+
+    thread = threading.Thread(target=post_comment)
+    thread.start()
+    started = time.monotonic()
+    response = client.get(
+        reverse('news:comments_since', args=(news.id,)), {'wait': 10}
+    )
+    thread.join()
+    assert time.monotonic() - started < 10
+    assert [comment['text'] for comment in response.json()['comments']] == [
+        'Свежий комментарий'
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_comments_since_wait_does_not_block_sync_views_under_asgi(
+    news, author
+):
+    author_client = AsyncClient()
+    author_client.force_login(author)
+
+    async def scenario():
+        client = AsyncClient()
+        # AsyncClient в Django 3.2 не передаёт data: параметры GET
+        # пишутся в адрес, тело POST кодируется вручную.
+        poll = asyncio.create_task(client.get(
+            reverse('news:comments_since', args=(news.id,)) + '?wait=10'
+        ))
+        await asyncio.sleep(0.1)
+        started = time.monotonic()
+        # Синхронные страницы под ASGI выполняются в одном общем потоке.
+        home = await client.get(reverse('news:home'))
+        home_duration = time.monotonic() - started
+        await author_client.post(
+            reverse('news:detail', args=(news.id,)),
+            urlencode({'text': 'Свежий комментарий'}),
+            content_type='application/x-www-form-urlencoded',
+        )
+        return home, home_duration, await asyncio.wait_for(poll, 5)
+
+    home, home_duration, response = async_to_sync(scenario)()
+    assert home.status_code == HTTPStatus.OK
+    assert home_duration < 1
+    assert [comment['text'] for comment in response.json()['comments']] == [
+        'Свежий комментарий'
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'cache_backend',
+    (
+        'django.core.cache.backends.locmem.LocMemCache',
+        'django.core.cache.backends.filebased.FileBasedCache',
+    )
+)
+def test_home_page_cache_hit_runs_no_queries(
+    client, all_news, settings, tmp_path, cache_backend,
+    django_assert_num_queries
+):
+    settings.CACHES = {
+        'default': {'BACKEND': cache_backend, 'LOCATION': str(tmp_path)}
+    }
+    url = reverse('news:home')
+    first_response = client.get(url)
+    with django_assert_num_queries(0):
+        response = client.get(url)
+    assert response.content == first_response.content
+
+
+@pytest.mark.django_db
+def test_home_page_cache_is_invalidated_on_write(
+    client, news, author, django_capture_on_commit_callbacks
+):
+    url = reverse('news:home')
+    client.get(url)
+    with django_capture_on_commit_callbacks(execute=True):
+        News.objects.create(title='Свежая новость', text='Текст')
+    assert 'Свежая новость' in client.get(url).content.decode()
+    with django_capture_on_commit_callbacks(execute=True):
+        Comment.objects.create(news=news, author=author, text='Текст')
+    assert 'Комментариев: 1' in client.get(url).content.decode()
+    with django_capture_on_commit_callbacks(execute=True):
+        News.objects.filter(pk=news.pk).delete()
+    assert news.title not in client.get(url).content.decode()
+
+
+@pytest.mark.django_db
+def test_home_page_cache_expires(client, news, settings):
+    settings.NEWS_HOME_PAGE_CACHE_TIMEOUT = 0
+    url = reverse('news:home')
+    client.get(url)
+    News.objects.update(title='Изменённый заголовок')
+    assert 'Изменённый заголовок' in client.get(url).content.decode()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_read_views_render_in_pool(news, comment):
+    factory = AsyncRequestFactory()
+    home = factory.get(reverse('news:home'))
+    home.user = AnonymousUser()
+    response = async_to_sync(async_views.news_list)(home)
+    assert news.title in response.content.decode()
+    detail = factory.get(reverse('news:detail', args=(news.pk,)))
+    detail.user = AnonymousUser()
+    with record_queries(QueryRecorder()) as recorder:
+        response = async_to_sync(async_views.news_detail)(detail, pk=news.pk)
+    assert response.status_code == HTTPStatus.OK
+    assert comment.text in response.content.decode()
+    assert recorder.count > 0
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', REPLICA_ALIAS])
+def test_news_pages_read_from_replica_until_user_writes(
+    client, author, settings
+):
+    settings.NEWS_READ_REPLICAS = [REPLICA_ALIAS]
+    news = News.objects.create(title='Заголовок на реплике', text='Текст')
+    sync_replicas()
+    News.objects.filter(pk=news.pk).update(title='Новый заголовок')
+    url = reverse('news:detail', args=(news.pk,))
+    assert 'Заголовок на реплике' in client.get(url).content.decode()
+    client.force_login(author)
+    response = client.post(url, {'text': 'Мой комментарий'})
+    assert STICKY_COOKIE in response.cookies
+    assert not Comment.objects.using(REPLICA_ALIAS).exists()
+    content = client.get(url).content.decode()
+    assert 'Новый заголовок' in content
+    assert 'Мой комментарий' in content
+    del client.cookies[STICKY_COOKIE]
+    assert 'Заголовок на реплике' in client.get(url).content.decode()
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', REPLICA_ALIAS])
+def test_user_logged_in_after_replica_sync_stays_authenticated(
+    client, django_user_model, settings
+):
+    settings.NEWS_READ_REPLICAS = [REPLICA_ALIAS]
+    news = News.objects.create(title='Заголовок на реплике', text='Текст')
+    sync_replicas()
+    News.objects.filter(pk=news.pk).update(title='Новый заголовок')
+    # Ни пользователя, ни его сессии на реплике нет.
+    user = django_user_model.objects.create(username='Новый пользователь')
+    client.force_login(user)
+    response = client.get(reverse('news:detail', args=(news.pk,)))
+    assert 'Заголовок на реплике' in response.content.decode()
+    assert response.context['user'] == user
+    assert 'form' in response.context
@@ -1,11 +1,30 @@
+import json
+import os
 from http import HTTPStatus
+from io import StringIO
+from unittest.mock import patch
 import pytest
 from pytest_django.asserts import assertRedirects, assertFormError
 
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.template import engines
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from news.models import Comment
+from news.database import (
+    check_connection, check_connections, mark_reused_connections,
+    pragma_statements
+)
+from news.models import Comment, News
 from news.forms import WARNING
+from news.moderation import BadWordsMatcher
+from news.pytest_tests.factories import (
+    CommentFactory, NewsFactory, UserFactory
+)
+from yanews.settings_production import TEMPLATES as PRODUCTION_TEMPLATES
 
 
 @pytest.mark.django_db
@@ -93,3 +112,349 @@ def test_user_cant_delete_comment_of_another_user(admin_client, comment):
     count_after_deletion = Comment.objects.count()
     count_difference = count_before_deletion - count_after_deletion
     assert count_difference == 0
+
+
+# Сессия, пользователь, объект страницы, затем SAVEPOINT, запись,
+# обновление счётчика у новости и RELEASE SAVEPOINT. Удаление идёт
+# через Collector, который не ставит точку сохранения.
+WRITE_QUERIES = 7
+DELETE_QUERIES = 5
+
+
+@pytest.mark.parametrize(
+    'name, args, queries',
+    (
+        (
+            'news:detail', pytest.lazy_fixture('news_id_for_args'),
+            WRITE_QUERIES,
+        ),
+        (
+            'news:edit', pytest.lazy_fixture('comment_id_for_args'),
+            WRITE_QUERIES,
+        ),
+        (
+            'news:delete', pytest.lazy_fixture('comment_id_for_args'),
+            DELETE_QUERIES,
+        ),
+    )
+)
+def test_comment_writes_do_not_refetch_objects(
+    author_client, name, args, queries, form_data, django_assert_num_queries
+):
+    url = reverse(name, args=args)
+    with django_assert_num_queries(queries):
+        response = author_client.post(url, data=form_data)
+    assert response.status_code == HTTPStatus.FOUND
+
+
+def test_comment_count_follows_create_and_delete(
+    author_client, news, form_data
+):
+    url = reverse('news:detail', args=(news.id,))
+    author_client.post(url, data=form_data)
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    comment = Comment.objects.get()
+    author_client.delete(reverse('news:delete', args=(comment.id,)))
+    news.refresh_from_db()
+    assert news.comment_count == 0
+
+
+def test_comment_count_follows_admin_inline(admin_client, news, comment):
+    url = reverse('admin:news_news_change', args=(news.id,))
+    inline_data = {
+        'title': news.title,
+        'text': news.text,
+        'date': news.date.isoformat(),
+        'comment_set-TOTAL_FORMS': 2,
+        'comment_set-INITIAL_FORMS': 1,
+        'comment_set-0-id': comment.id,
+        'comment_set-0-news': news.id,
+        'comment_set-0-author': comment.author.id,
+        'comment_set-0-text': comment.text,
+        'comment_set-0-DELETE': 'on',
+        'comment_set-1-news': news.id,
+        'comment_set-1-author': comment.author.id,
+        'comment_set-1-text': 'Новый',
+    }
+    admin_client.post(url, data=inline_data)
+    news.refresh_from_db()
+    assert news.comment_count == Comment.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_comment_count_follows_bulk_and_cascade_deletes(news, author):
+    other = News.objects.create(title='Другая', text='Текст')
+    CommentFactory().create_batch(3, news=news, author=author)
+    CommentFactory().create_batch(2, news=other, author=author)
+    Comment.objects.filter(news=news).order_by('pk')[:1].get().delete()
+    Comment.objects.filter(
+        pk__in=Comment.objects.filter(news=news).values('pk')[:1]
+    ).delete()
+    news.refresh_from_db()
+    assert news.comment_count == Comment.objects.filter(news=news).count()
+    author.delete()
+    assert list(
+        News.objects.order_by('pk').values_list('comment_count', flat=True)
+    ) == [0, 0]
+
+
+def count_delete_queries(obj):
+    with CaptureQueriesContext(connection) as context:
+        obj.delete()
+    return len(context), [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('UPDATE "news_news"')
+    ]
+
+
+@pytest.mark.django_db
+def test_cascade_delete_recounts_each_news_once(news, author):
+    other = News.objects.create(title='Другая', text='Текст')
+    CommentFactory().create_batch(5, news=news, author=author)
+    CommentFactory().create_batch(3, news=other, author=author)
+    assert len(count_delete_queries(author)[1]) == 2
+    assert list(
+        News.objects.order_by('pk').values_list('comment_count', flat=True)
+    ) == [0, 0]
+    # Число запросов при удалении новости не зависит от числа
+    # её комментариев.
+    reader = UserFactory().create()
+    CommentFactory().create(news=news, author=reader)
+    CommentFactory().create_batch(5, news=other, author=reader)
+    assert count_delete_queries(news)[0] == count_delete_queries(other)[0]
+
+
+@pytest.mark.django_db
+def test_deleting_deleted_comment_keeps_count(news, comment):
+    stale = Comment.objects.get(pk=comment.pk)
+    comment.delete()
+    stale.delete()
+    news.refresh_from_db()
+    assert news.comment_count == 0
+
+
+@pytest.mark.django_db
+def test_recount_comments_repairs_drift(news, comment):
+    News.objects.update(comment_count=42)
+    call_command('recount_comments', stdout=StringIO())
+    news.refresh_from_db()
+    assert news.comment_count == 1
+
+
+def test_bad_words_matcher_reports_every_match():
+    matcher = BadWordsMatcher(('Редиска', 'редис', 'негодяй', 'дурак', 'рак'))
+    text = 'Редиска, редис и НЕГОДЯЙ, дурак'
+    assert matcher.find_all(text) == [
+        'редис', 'редиска', 'редис', 'негодяй', 'дурак', 'рак'
+    ]
+    assert matcher.find_all('Просто текст') == []
+
+
+def test_bad_words_file_is_reloaded(
+    author_client, news, form_data, settings, tmp_path
+):
+    words_file = tmp_path / 'bad_words.txt'
+    words_file.write_text('# Словарь\nтекст\n', encoding='utf-8')
+    settings.BAD_WORDS_FILE = str(words_file)
+    url = reverse('news:detail', args=(news.id,))
+    response = author_client.post(url, data=form_data)
+    assertFormError(response, form='form', field='text', errors=WARNING)
+    words_file.write_text('капуста\n', encoding='utf-8')
+    stat = words_file.stat()
+    os.utime(words_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    response = author_client.post(url, data=form_data)
+    assertRedirects(response, f'{url}#comments')
+
+
+def test_missing_bad_words_file_falls_back_to_defaults(
+    author_client, news, bad_words_data, settings, tmp_path
+):
+    settings.BAD_WORDS_FILE = str(tmp_path / 'missing.txt')
+    url = reverse('news:detail', args=(news.id,))
+    response = author_client.post(url, data=bad_words_data)
+    assertFormError(response, form='form', field='text', errors=WARNING)
+
+
+@pytest.mark.django_db
+def test_load_news_rejects_non_utf8_file(tmp_path):
+    news_file = tmp_path / 'news.csv'
+    news_file.write_bytes('title,text\nНовость,Текст\n'.encode('cp1251'))
+    with pytest.raises(CommandError, match='UTF-8'):
+        call_command('load_news', str(news_file), stdout=StringIO())
+    assert not News.objects.exists()
+
+
+@pytest.mark.django_db
+def test_load_news_streams_news_and_comments(author, tmp_path):
+    news_file = tmp_path / 'news.jsonl'
+    news_file.write_text('\n'.join((
+        json.dumps({'id': 7, 'title': 'Первая', 'text': 'Текст',
+                    'date': '2020-01-02'}),
+        json.dumps({'title': 'Вторая', 'text': 'Текст'}),
+        json.dumps({'id': 7, 'title': 'Повтор', 'text': 'Текст'}),
+        json.dumps({'title': 'Без текста'}),
+        'не json',
+    )), encoding='utf-8')
+    errors = StringIO()
+    call_command(
+        'load_news', str(news_file), batch_size=2,
+        stdout=StringIO(), stderr=errors,
+    )
+    assert News.objects.count() == 2
+    assert News.objects.get(pk=7).date.isoformat() == '2020-01-02'
+    assert len(errors.getvalue().splitlines()) == 3
+
+    comments_file = tmp_path / 'comments.csv'
+    comments_file.write_text(
+        'news,author,text,created\n'
+        f'7,{author.username},Старый,2020-01-03T10:00:00+00:00\n'
+        f'7,{author.username},Новый,\n'
+        f'999,{author.username},Чужая новость,\n'
+        '7,nobody,Без автора,\n',
+        encoding='utf-8',
+    )
+    errors = StringIO()
+    output = StringIO()
+    call_command(
+        'load_news', str(comments_file), model='comments', batch_size=3,
+        stdout=output, stderr=errors,
+    )
+    news = News.objects.get(pk=7)
+    assert news.comment_count == Comment.objects.count() == 2
+    assert news.comment_set.first().created.isoformat() == (
+        '2020-01-03T10:00:00+00:00'
+    )
+    assert len(errors.getvalue().splitlines()) == 2
+    assert 'строк/с' in output.getvalue()
+
+
+@pytest.mark.django_db
+def test_load_news_reports_out_of_range_ids(author, tmp_path):
+    news_file = tmp_path / 'news.jsonl'
+    news_file.write_text('\n'.join((
+        json.dumps({'id': 99999999999999999999, 'title': 'Огромный id',
+                    'text': 'Текст'}),
+        json.dumps({'id': '²', 'title': 'Не число', 'text': 'Текст'}),
+        json.dumps({'id': 7, 'title': 'Первая', 'text': 'Текст'}),
+    )), encoding='utf-8')
+    errors = StringIO()
+    call_command(
+        'load_news', str(news_file), stdout=StringIO(), stderr=errors
+    )
+    assert list(News.objects.values_list('pk', flat=True)) == [7]
+    assert [
+        json.loads(line)['line'] for line in errors.getvalue().splitlines()
+    ] == [1, 2]
+
+    comments_file = tmp_path / 'comments.jsonl'
+    comments_file.write_text('\n'.join(
+        json.dumps({'news': news_id, 'author': author.username,
+                    'text': 'Комментарий'})
+        for news_id in ('99999999999999999999', '²', '-7', '7')
+    ), encoding='utf-8')
+    errors = StringIO()
+    call_command(
+        'load_news', str(comments_file), model='comments',
+        stdout=StringIO(), stderr=errors,
+    )
+    news = News.objects.get(pk=7)
+    assert news.comment_count == Comment.objects.count() == 1
+    assert len(errors.getvalue().splitlines()) == 3
+
+
+@pytest.mark.django_db
+def test_bundled_fixture_loads():
+    call_command('loaddata', 'news.json', verbosity=0)
+    assert News.objects.exists()
+    assert not News.objects.filter(modified__isnull=True).exists()
+
+
+@pytest.mark.django_db
+def test_factories_are_deterministic_and_keep_counters(author):
+    # Нумерация начинается заново в каждом тесте.
+    assert UserFactory().build().username == 'user0'
+    all_news = NewsFactory(seed=1).create_batch(3)
+    assert NewsFactory(seed=1).build().title == all_news[0].title
+    CommentFactory().create_batch(
+        5, news=lambda index: all_news[index % 3], author=author
+    )
+    counts = News.objects.order_by('pk').values_list(
+        'comment_count', flat=True
+    )
+    assert list(counts) == [2, 2, 1]
+
+
+@pytest.mark.django_db
+def test_new_sqlite_connections_get_pragmas_and_health_checks(
+    settings, tmp_path
+):
+    settings.SQLITE_PRAGMAS = {'synchronous': 'OFF', 'cache_size': -1024}
+    # Соединение с базой в памяти SQLite не закрывается вовсе.
+    connection = DatabaseWrapper({
+        **connections['default'].settings_dict,
+        'NAME': str(tmp_path / 'db.sqlite3'),
+    })
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            assert cursor.fetchone() == (0,)
+            cursor.execute('PRAGMA cache_size')
+            assert cursor.fetchone() == (-1024,)
+        check_connection(connection)
+        assert connection.connection is not None
+        connection.connection.close()
+        check_connection(connection)
+        assert connection.connection is None
+    finally:
+        connection.close()
+
+
+def test_sqlite_pragmas_are_validated():
+    assert pragma_statements({'cache_size': -1024}) == [
+        'PRAGMA cache_size = -1024'
+    ]
+    for pragmas in (
+        {'writable_schema': 'ON'},
+        {'synchronous': 'OFF; DROP TABLE news_news'},
+    ):
+        with pytest.raises(ImproperlyConfigured):
+            pragma_statements(pragmas)
+
+
+@pytest.mark.django_db
+def test_health_checks_only_connections_left_by_previous_request(settings):
+    settings.DATABASE_HEALTH_CHECKS = True
+    connections['default'].ensure_connection()
+    with patch('news.database.check_connection') as check:
+        # Соединение открыто не в ходе запроса.
+        check_connections()
+        check.assert_not_called()
+        mark_reused_connections()
+        check_connections()
+        check.assert_any_call(connections['default'])
+        calls = check.call_count
+        # Проверка — одна на запрос.
+        check_connections()
+        assert check.call_count == calls
+
+
+def test_precompile_templates_fills_cache_and_reports_errors(
+    settings, tmp_path
+):
+    settings.TEMPLATES = PRODUCTION_TEMPLATES
+    output = StringIO()
+    call_command('precompile_templates', stdout=output)
+    assert 'Скомпилировано шаблонов' in output.getvalue()
+    cached_loader, = engines['django'].engine.template_loaders
+    assert 'news/home.html' in cached_loader.get_template_cache
+    (tmp_path / 'broken.html').write_text('{% if %}', encoding='utf-8')
+    (tmp_path / 'cp1251.html').write_bytes('Новость'.encode('cp1251'))
+    (tmp_path / 'logo.png').write_bytes(b'\x89PNG\r\n\x1a\n\xff')
+    settings.TEMPLATES = [{**PRODUCTION_TEMPLATES[0], 'DIRS': [tmp_path]}]
+    errors = StringIO()
+    with pytest.raises(CommandError, match='Шаблонов с ошибками: 2'):
+        call_command('precompile_templates', stderr=errors)
+    assert 'broken.html' in errors.getvalue()
+    assert 'cp1251.html' in errors.getvalue()
+    assert 'logo.png' not in errors.getvalue()
@@ -1,9 +1,27 @@
 from http import HTTPStatus
 import pytest
 
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
 from django.urls import reverse
 from pytest_django.asserts import assertRedirects
 
+from news.models import Comment
+from yanews.profiling import request_stats
+
+# Лимиты на число SQL-запросов и размер ответа в байтах.
+ROUTE_BUDGETS = {
+    'news:home': (3, 5_000),
+    'news:detail': (6, 15_000),
+    'news:edit': (3, 5_000),
+    'news:delete': (3, 5_000),
+    'users:login': (2, 5_000),
+    'users:logout': (4, 5_000),
+    'users:signup': (1, 5_000),
+}
+# Анонимного пользователя перенаправляют, не обращаясь к базе.
+REDIRECT_BUDGET = (0, 0)
+
 
 @pytest.mark.django_db
 @pytest.mark.parametrize(
@@ -16,9 +34,9 @@ from pytest_django.asserts import assertRedirects
         ('users:signup', None),
     )
 )
-def test_pages_availability(client, name, args):
+def test_pages_availability(client, name, args, assert_budget):
     url = reverse(name, args=args)
-    response = client.get(url)
+    response = assert_budget(client, url, *ROUTE_BUDGETS[name])
     assert response.status_code == HTTPStatus.OK
 
 
@@ -38,10 +56,10 @@ def test_pages_availability(client, name, args):
     )
 )
 def test_availability_for_comment_edit_and_delete(
-    parametrized_client, expected_status, name, args,
+    parametrized_client, expected_status, name, args, assert_budget,
 ):
     url = reverse(name, args=args)
-    response = parametrized_client.get(url)
+    response = assert_budget(parametrized_client, url, *ROUTE_BUDGETS[name])
     assert response.status_code == expected_status
 
 
@@ -53,9 +71,66 @@ def test_availability_for_comment_edit_and_delete(
         ('news:delete', pytest.lazy_fixture('comment_id_for_args')),
     )
 )
-def test_redirect_for_anonymous_client(client, name, args):
+def test_redirect_for_anonymous_client(client, name, args, assert_budget):
     login_url = reverse('users:login')
     url = reverse(name, args=args)
     expected_url = f'{login_url}?next={url}'
-    response = client.get(url)
+    response = assert_budget(client, url, *REDIRECT_BUDGET)
     assertRedirects(response, expected_url)
+
+
+@pytest.mark.django_db
+def test_news_detail_answers_conditional_get(client, news, author):
+    url = reverse('news:detail', args=(news.id,))
+    response = client.get(url)
+    etag = response['ETag']
+    assert not response.has_header('Last-Modified')
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    Comment.objects.create(news=news, author=author, text='Новый')
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.django_db
+def test_news_detail_etag_depends_on_user(client, admin_client, news):
+    url = reverse('news:detail', args=(news.id,))
+    etag = client.get(url)['ETag']
+    response = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.django_db
+def test_news_detail_etag_changes_with_csrf_token(
+    author_client, news, settings
+):
+    url = reverse('news:detail', args=(news.id,))
+    etag = author_client.get(url)['ETag']
+    response = author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    # Так токен меняется при входе (django.middleware.csrf.rotate_token).
+    author_client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+    response = author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.django_db
+def test_profiling_reports_per_route_stats(client, admin_client, news):
+    request_stats.clear()
+    response = client.get(reverse('news:home'))
+    assert 'sql;dur=' in response['Server-Timing']
+    url = reverse('profiling')
+    assert client.get(url).status_code == HTTPStatus.FOUND
+    stats = admin_client.get(url).json()['news:home']
+    assert stats['requests'] == 1
+    assert stats['queries']['p99'] >= 1
+    assert set(stats['duration_ms']) == {'p50', 'p95', 'p99'}
+
+
+@pytest.mark.django_db
+def test_profiling_counts_sync_view_queries_under_asgi(news):
+    response = async_to_sync(AsyncClient().get)(
+        reverse('news:detail', args=(news.pk,))
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert '"0 queries' not in response['Server-Timing']
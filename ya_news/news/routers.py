@@ -0,0 +1,113 @@
+"""
+Чтение страниц новостей с реплик.
+
+Главная страница и страница новости выполняются внутри read_from:
+их запросы на чтение новостей и комментариев ReplicaRouter отправляет
+на одну из реплик из настройки NEWS_READ_REPLICAS. Все остальные
+запросы, в том числе сессии, пользователи и любые записи, идут
+в основную базу.
+
+Пользователь, который только что оставил комментарий, получает cookie
+STICKY_COOKIE и NEWS_REPLICA_STICKY_SECONDS секунд читает с основной
+базы, чтобы сразу увидеть свою запись, даже если реплика отстаёт.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http import HTTPStatus
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = 'news_primary'
+
+_read_alias = ContextVar('news_read_alias', default=None)
+
+
+class ReplicaRouter:
+    """
+    Чтение моделей news внутри read_from — с реплики, запись —
+    в основную базу.
+
+    Сессии и пользователи читаются с основной базы и внутри read_from:
+    на реплике ещё может не быть сессии только что вошедшего
+    пользователя, и он оказался бы анонимным.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'news':
+            return None
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """В репликах те же данные, что и в основной базе."""
+        return True
+
+
+@contextmanager
+def read_from(alias):
+    """Направляет чтение на alias; None — обычная маршрутизация."""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def choose_replica(request):
+    """Случайная реплика или None, если пользователь недавно писал."""
+    if not settings.NEWS_READ_REPLICAS or STICKY_COOKIE in request.COOKIES:
+        return None
+    return random.choice(settings.NEWS_READ_REPLICAS)
+
+
+class ReplicaReadMixin:
+    """
+    Страница читает данные с реплики.
+
+    Шаблон отрисовывается здесь же: ленивые queryset выполняются
+    при отрисовке и должны попасть на ту же базу.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with read_from(choose_replica(request)):
+            response = super().dispatch(request, *args, **kwargs)
+            if callable(getattr(response, 'render', None)):
+                response.render()
+        return response
+
+
+class StickyWriteMixin:
+    """После успешной записи (редирект в ответ на POST) ставит cookie."""
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if (
+            request.method == 'POST'
+            and response.status_code == HTTPStatus.FOUND
+            and settings.NEWS_READ_REPLICAS
+        ):
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=settings.NEWS_REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+def sync_replicas(aliases=None):
+    """
+    Копирует основную базу SQLite в реплики через backup API.
+
+    Для локальной проверки и тестов, где реплики — отдельные файлы
+    или базы в памяти, а не настоящая репликация.
+    """
+    source = connections[DEFAULT_DB_ALIAS]
+    source.ensure_connection()
+    for alias in aliases or settings.NEWS_READ_REPLICAS:
+        target = connections[alias]
+        target.ensure_connection()
+        source.connection.backup(target.connection)
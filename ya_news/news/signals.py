@@ -0,0 +1,92 @@
+"""
+Обработчики сигналов моделей новостей.
+
+Счётчик комментариев у новости и версию кэша главной страницы
+поддерживают сигналы post_save и post_delete, а не методы моделей:
+post_delete срабатывает и при QuerySet.delete() (в том числе «удалить
+выбранные» в админке), и при каскадном удалении вместе с новостью или
+пользователем. Обработчики выполняются в той же транзакции, что и
+запись, и подключаются в NewsConfig.ready.
+"""
+import threading
+from collections import defaultdict
+from weakref import WeakSet
+
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import invalidate_home_page
+from .models import News
+
+_local = threading.local()
+
+
+def fill_modified(sender, instance, raw, **kwargs):
+    """
+    Обработчик pre_save для News: дата изменения для loaddata.
+
+    loaddata сохраняет объекты в режиме raw, и auto_now не срабатывает,
+    а в фикстурах, снятых до появления поля, его нет. default вместе
+    с auto_now Django не разрешает (fields.E160).
+    """
+    if raw and instance.modified is None:
+        instance.modified = timezone.now()
+
+
+def news_changed(sender, using, **kwargs):
+    """Сбрасывает кэш главной после сохранения или удаления новости."""
+    invalidate_home_page(using=using)
+
+
+def comment_saved(sender, instance, created, using, **kwargs):
+    """Обновляет дату изменения новости, новый комментарий — и счётчик."""
+    fields = {'modified': timezone.now()}
+    if created:
+        fields['comment_count'] = F('comment_count') + 1
+    News.objects.using(using).filter(pk=instance.news_id).update(**fields)
+    if created:
+        invalidate_home_page(using=using)
+
+
+def comment_deleting(sender, instance, using, **kwargs):
+    """
+    Обработчик pre_delete: запоминает комментарии, которые удаляются.
+
+    Collector сначала отправляет pre_delete для всех удаляемых объектов
+    и только потом удаляет их, поэтому к первому post_delete известны
+    все комментарии новости, удаляемые вместе.
+    """
+    _deleting_comments()[using, instance.news_id].add(instance)
+
+
+def comment_deleted(sender, instance, using, **kwargs):
+    """
+    Пересчитывает счётчик у новости удалённых комментариев.
+
+    Пересчёт один на новость — после последнего из её комментариев,
+    удаляемых вместе, а не после каждого. Collector отправляет
+    post_delete, даже если строку уже удалил другой запрос, поэтому
+    счётчик не уменьшается на единицу, а считается заново и не может
+    уйти ниже нуля.
+    """
+    deleting = _deleting_comments()
+    key = using, instance.news_id
+    deleting[key].discard(instance)
+    if deleting[key]:
+        return
+    del deleting[key]
+    News.objects.using(using).filter(pk=instance.news_id).recount_comments(
+        modified=timezone.now()
+    )
+
+
+def _deleting_comments():
+    """
+    Удаляемые комментарии по (база, id новости) в текущем потоке.
+
+    Ссылки слабые: если удаление прервалось ошибкой, его комментарии
+    исчезнут отсюда вместе с Collector и не задержат пересчёт.
+    """
+    if not hasattr(_local, 'deleting_comments'):
+        _local.deleting_comments = defaultdict(WeakSet)
+    return _local.deleting_comments
@@ -1,12 +1,29 @@
+from django.conf import settings
 from django.urls import path
 
-from news import views
+from news import async_views, views
 
 app_name = 'news'
 
+if settings.ASYNC_READ_VIEWS:
+    news_list, news_detail = async_views.news_list, async_views.news_detail
+else:
+    news_list = views.NewsList.as_view()
+    news_detail = views.NewsDetailView.as_view()
+
 urlpatterns = [
-    path('', views.NewsList.as_view(), name='home'),
-    path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
+    path('', news_list, name='home'),
+    path('news/<int:pk>/', news_detail, name='detail'),
+    path(
+        'news/<int:pk>/comments/',
+        views.NewsComments.as_view(),
+        name='comments'
+    ),
+    path(
+        'news/<int:pk>/comments/since/',
+        views.news_comments_since,
+        name='comments_since'
+    ),
     path(
         'delete_comment/<int:pk>/',
         views.CommentDelete.as_view(),
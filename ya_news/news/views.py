@@ -1,14 +1,43 @@
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404
+from django.db import close_old_connections
+from django.db.models import F
+from django.http import Http404, JsonResponse
+from django.middleware.csrf import get_token
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.http import condition
 
+from .cache import get_home_page_version
 from .forms import CommentForm
 from .models import Comment, News
+from .notifications import (
+    get_comments_version, notify_new_comment, wait_for_comments
+)
+from .pagination import encode_cursor, get_comments_page, get_page_size
+from .routers import ReplicaReadMixin, StickyWriteMixin
+
+
+def get_owned_comment_ids(user, comments):
+    """
+    Id комментариев из comments, которые может менять пользователь.
 
+    Один запрос только по id, без загрузки авторов; для анонимного
+    пользователя запроса нет вовсе.
+    """
+    if not user.is_authenticated or not comments:
+        return set()
+    return set(Comment.objects.filter(
+        author=user, pk__in=[comment.pk for comment in comments]
+    ).order_by().values_list('pk', flat=True))
 
-class NewsList(generic.ListView):
+
+class NewsList(ReplicaReadMixin, generic.ListView):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
@@ -18,22 +47,91 @@ class NewsList(generic.ListView):
         Выводим только несколько последних новостей.
 
         Их количество определяется в настройках проекта.
+        Количество комментариев хранится в самой новости,
+        сами комментарии не загружаются.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return self.model.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE]
 
+    def get_context_data(self, **kwargs):
+        """
+        Список новостей кэшируется в шаблоне по версии главной страницы.
 
-class NewsDetail(generic.DetailView):
-    model = News
-    template_name = 'news/detail.html'
+        Queryset ленивый, так что при попадании в кэш SQL не выполняется.
+        """
+        context = super().get_context_data(**kwargs)
+        context['home_page_version'] = get_home_page_version()
+        context['home_page_cache_timeout'] = (
+            settings.NEWS_HOME_PAGE_CACHE_TIMEOUT
+        )
+        return context
 
-    def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
+
+class CommentsPageMixin:
+    """Добавляет в контекст одну страницу комментариев к новости."""
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        limit = self.request.GET.get('limit')
+        page_size = get_page_size(limit)
+        try:
+            comments, next_cursor = get_comments_page(
+                self.object,
+                cursor=self.request.GET.get('cursor'),
+                page_size=page_size,
+            )
+        except ValueError:
+            raise Http404('Неверный курсор комментариев.')
+        context['comments'] = comments
+        context['next_cursor'] = next_cursor
+        # Ссылка «Загрузить ещё» сохраняет размер страницы из запроса.
+        context['comments_limit'] = page_size if limit is not None else None
+        context['owned_comment_ids'] = get_owned_comment_ids(
+            self.request.user, comments
         )
-        return obj
+        return context
+
+
+def news_modified(request, pk):
+    """
+    Время последнего изменения новости или комментариев к ней.
+
+    Значение запоминается в запросе, чтобы не читать его повторно.
+    """
+    if not hasattr(request, 'news_modified'):
+        request.news_modified = News.objects.filter(
+            pk=pk
+        ).values_list('modified', flat=True).first()
+    return request.news_modified
+
+
+def news_etag(request, pk, **kwargs):
+    """
+    ETag страницы новости.
+
+    Ссылки на редактирование комментариев и форма зависят от пользователя,
+    поэтому его id входит в ETag. Форма содержит CSRF-токен, который
+    меняется при входе: в ETag входит хеш его секрета, иначе страница
+    из кэша браузера отправила бы комментарий со старым токеном.
+    Last-Modified не отдаётся: у него секундная точность и он не
+    зависит от пользователя.
+    """
+    modified = news_modified(request, pk)
+    if modified is None:
+        return None
+    etag = f'{pk}-{modified.timestamp()}-{request.user.pk or 0}'
+    if request.user.is_authenticated:
+        # get_token создаёт секрет, если его ещё нет; в META он
+        # хранится в том виде, в каком уйдёт в cookie.
+        get_token(request)
+        secret = request.META['CSRF_COOKIE'].encode()
+        etag += '-' + hashlib.sha256(secret).hexdigest()[:16]
+    return etag
+
+
+@method_decorator(condition(etag_func=news_etag), name='get')
+class NewsDetail(ReplicaReadMixin, CommentsPageMixin, generic.DetailView):
+    model = News
+    template_name = 'news/detail.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -42,8 +140,90 @@ class NewsDetail(generic.DetailView):
         return context
 
 
+class NewsComments(
+        ReplicaReadMixin, CommentsPageMixin, generic.DetailView
+):
+    """Следующая страница комментариев («Загрузить ещё»)."""
+    model = News
+    template_name = 'news/comments.html'
+
+
+def get_wait_timeout(value=None):
+    """Время ожидания новых комментариев из запроса, в секундах."""
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        return 0
+    return max(0, min(timeout, settings.NEWS_LONG_POLL_TIMEOUT))
+
+
+def get_comments_since(pk, cursor, page_size, check_news=False):
+    """
+    Страница комментариев для news_comments_since.
+
+    Выполняется в пуле потоков: соединение, открытое там, закрывается
+    здесь же, потому что request_finished закрывает соединения только
+    своего потока.
+    """
+    try:
+        if check_news and not News.objects.filter(pk=pk).exists():
+            raise Http404('Новость не найдена.')
+        try:
+            return get_comments_page(pk, cursor=cursor, page_size=page_size)
+        except ValueError:
+            raise Http404('Неверный курсор комментариев.')
+    finally:
+        close_old_connections()
+
+
+async def news_comments_since(request, pk):
+    """
+    Комментарии к новости после курсора в JSON.
+
+    Курсор тот же, что у «Загрузить ещё». Если новых комментариев нет,
+    а в параметре wait задано время в секундах, запрос ждёт уведомления
+    о новом комментарии (long-polling), но не дольше
+    NEWS_LONG_POLL_TIMEOUT. Чтение идёт из основной базы: реплика
+    может ещё не знать о комментарии, о котором пришло уведомление.
+
+    Страница асинхронная: под ASGI ожидание не занимает общий поток,
+    в котором Django 3.2 выполняет синхронные страницы, а база читается
+    в пуле потоков (thread_sensitive=False).
+    """
+    load = sync_to_async(get_comments_since, thread_sensitive=False)
+    cursor = request.GET.get('cursor')
+    page_size = get_page_size(request.GET.get('limit'))
+    deadline = time.monotonic() + get_wait_timeout(request.GET.get('wait'))
+    # Версия читается до запроса, чтобы не пропустить уведомление.
+    version = get_comments_version(pk)
+    comments, next_cursor = await load(
+        pk, cursor, page_size, check_news=True
+    )
+    while not comments:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0 or not await wait_for_comments(pk, version, timeout):
+            break
+        version = get_comments_version(pk)
+        comments, next_cursor = await load(pk, cursor, page_size)
+    return JsonResponse({
+        'comments': [
+            {
+                'id': comment.pk,
+                'author': comment.author_name,
+                'text': comment.text,
+                'created': comment.created,
+            }
+            for comment in comments
+        ],
+        'cursor': encode_cursor(comments[-1]) if comments else cursor,
+        'has_more': next_cursor is not None,
+    })
+
+
 class NewsComment(
+        StickyWriteMixin,
         LoginRequiredMixin,
+        CommentsPageMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -60,11 +240,14 @@ class NewsComment(
         comment.news = self.object
         comment.author = self.request.user
         comment.save()
+        notify_new_comment(self.object.pk)
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        """Новость уже загружена в post(), повторный get_object не нужен."""
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
@@ -78,19 +261,25 @@ class NewsDetailView(generic.View):
         return view(request, *args, **kwargs)
 
 
-class CommentBase(LoginRequiredMixin):
+class CommentBase(StickyWriteMixin, LoginRequiredMixin):
     """Базовый класс для работы с комментариями."""
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
+        """Комментарий уже получен в self.object, второй запрос не нужен."""
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
-        """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        """
+        Пользователь может работать только со своими комментариями.
+
+        Заголовок новости для шаблона приходит тем же запросом.
+        """
+        return self.model.objects.filter(
+            author=self.request.user
+        ).annotate(news_title=F('news__title'))
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
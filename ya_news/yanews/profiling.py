@@ -0,0 +1,240 @@
+"""
+Замер стоимости запросов YaNews: время ответа, число и время SQL-запросов.
+
+profiling_middleware кладёт recorder запроса в контекстную переменную,
+отдаёт итоги запроса в заголовке Server-Timing и копит скользящую
+статистику по имени маршрута, которую показывает stats_view.
+
+Запросы к базе recorder получает через execute_wrapper, который
+ставится на каждое соединение при его открытии и при начале запроса.
+Контекстные переменные asgiref переносит в потоки sync_to_async,
+поэтому под ASGI учитываются и запросы синхронных страниц и
+middleware, и запросы страниц из пула async_views.
+"""
+import asyncio
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import JsonResponse
+from django.utils.decorators import sync_and_async_middleware
+
+PERCENTILES = (50, 95, 99)
+UNRESOLVED = '<unresolved>'
+
+current_recorder = ContextVar('current_recorder', default=None)
+
+
+class QueryRecorder:
+    """
+    execute_wrapper, считающий запросы, их время и повторы.
+
+    С record_callsites=True запоминает ещё и SQL каждого запроса вместе
+    с местом в коде проекта, откуда он выполнен.
+    """
+
+    def __init__(self, record_callsites=False):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.queries = [] if record_callsites else None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+            if self.queries is not None:
+                self.queries.append((callsite(), sql))
+
+    @property
+    def duplicates(self):
+        """Запросы, чей SQL уже выполнялся в этом же запросе: признак N+1."""
+        return self.count - len(self.statements)
+
+    def format_queries(self):
+        """Записанные запросы, сгруппированные по месту вызова."""
+        groups = defaultdict(Counter)
+        for site, sql in self.queries or ():
+            groups[site][sql] += 1
+        lines = []
+        for site, statements in groups.items():
+            lines.append(f'{site}: {sum(statements.values())} запрос(ов)')
+            lines.extend(
+                f'    {count} × {sql}' for sql, count in statements.items()
+            )
+        return '\n'.join(lines)
+
+
+def callsite():
+    """Ближайший к запросу кадр стека из кода проекта, а не библиотек."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        if (
+            frame.filename.startswith(base_dir)
+            and 'site-packages' not in frame.filename
+            and frame.filename != __file__
+        ):
+            return f'{frame.filename[len(base_dir) + 1:]}:{frame.lineno}'
+    return '<unknown>'
+
+
+class RequestStats:
+    """Последние замеры по каждому маршруту в памяти процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(self.new_window)
+
+    @staticmethod
+    def new_window():
+        return deque(maxlen=getattr(settings, 'PROFILING_WINDOW', 1000))
+
+    def add(self, name, duration, queries, sql_duration, duplicates):
+        with self.lock:
+            self.samples[name].append(
+                (duration, queries, sql_duration, duplicates)
+            )
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+    def summary(self):
+        """Перцентили времени ответа, числа запросов и времени SQL."""
+        with self.lock:
+            samples = {
+                name: list(window) for name, window in self.samples.items()
+            }
+        return {
+            name: {
+                'requests': len(window),
+                **{
+                    metric: percentiles(values)
+                    for metric, values in zip(
+                        ('duration_ms', 'queries', 'sql_ms', 'duplicates'),
+                        zip(*window),
+                    )
+                },
+            }
+            for name, window in sorted(samples.items())
+        }
+
+
+def percentiles(values):
+    """Перцентили по методу ближайшего ранга."""
+    values = sorted(values)
+    return {
+        f'p{percent}': values[
+            max(0, -(-len(values) * percent // 100) - 1)
+        ]
+        for percent in PERCENTILES
+    }
+
+
+request_stats = RequestStats()
+
+
+@contextmanager
+def record_queries(recorder):
+    """
+    Направляет в recorder запросы текущего контекста.
+
+    Запросы учитываются в любом потоке, куда перешёл контекст, но только
+    на соединениях, где уже стоит record_current_query.
+    """
+    token = current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        current_recorder.reset(token)
+
+
+def record_current_query(execute, sql, params, many, context):
+    """execute_wrapper всех соединений: отдаёт запрос recorder контекста."""
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_recorder(connection):
+    if record_current_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_current_query)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    install_recorder(connection)
+
+
+@receiver(request_started)
+def request_began(**kwargs):
+    """
+    Соединения потока, где выполняется запрос, открытые раньше,
+    чем загрузился этот модуль. Под ASGI сигнал отправляется
+    из того же потока, что и синхронные страницы.
+    """
+    for connection in connections.all():
+        install_recorder(connection)
+
+
+@sync_and_async_middleware
+def profiling_middleware(get_response):
+    """
+    Замеряет каждый запрос.
+
+    Ставится первой в MIDDLEWARE, чтобы время ответа включало
+    остальные middleware.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            recorder, started = QueryRecorder(), time.perf_counter()
+            with record_queries(recorder):
+                response = await get_response(request)
+            return finish(request, response, recorder, started)
+    else:
+        def middleware(request):
+            recorder, started = QueryRecorder(), time.perf_counter()
+            with record_queries(recorder):
+                response = get_response(request)
+            return finish(request, response, recorder, started)
+    return middleware
+
+
+def finish(request, response, recorder, started):
+    """Ставит заголовок Server-Timing и добавляет замер в статистику."""
+    duration = (time.perf_counter() - started) * 1000
+    sql_duration = recorder.duration * 1000
+    response['Server-Timing'] = (
+        f'total;dur={duration:.1f}, '
+        f'sql;dur={sql_duration:.1f};desc="{recorder.count} queries, '
+        f'{recorder.duplicates} duplicates"'
+    )
+    match = getattr(request, 'resolver_match', None)
+    request_stats.add(
+        match.view_name if match else UNRESOLVED,
+        duration,
+        recorder.count,
+        sql_duration,
+        recorder.duplicates,
+    )
+    return response
+
+
+@staff_member_required
+def stats_view(request):
+    """Статистика по маршрутам для сотрудников."""
+    return JsonResponse(request_stats.summary())
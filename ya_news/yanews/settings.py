@@ -21,6 +21,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanews.profiling.profiling_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +59,22 @@ DATABASES = {
     }
 }
 
+DATABASE_ROUTERS = ['news.routers.ReplicaRouter']
+
+# Псевдонимы баз из DATABASES, с которых читают главная страница и
+# страница новости (news.routers). Локально репликой может быть копия
+# db.sqlite3, которую обновляет команда sync_replicas.
+NEWS_READ_REPLICAS = []
+# Сколько секунд после записи пользователь читает с основной базы.
+NEWS_REPLICA_STICKY_SECONDS = 10
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -80,3 +97,34 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+# Сколько секунд хранится фрагмент главной страницы. Записи через модели
+# сбрасывают его сразу; срок страхует от изменений в обход сигналов,
+# например QuerySet.update().
+NEWS_HOME_PAGE_CACHE_TIMEOUT = 300
+
+COMMENTS_COUNT_ON_NEWS_PAGE = 20
+COMMENTS_MAX_PAGE_SIZE = 100
+# Сколько секунд news:comments_since может ждать новых комментариев.
+NEWS_LONG_POLL_TIMEOUT = 25
+
+# Файл со словарём запрещённых слов, по одному слову в строке.
+# Если не задан, используется news.forms.BAD_WORDS.
+BAD_WORDS_FILE = None
+
+# Сколько последних замеров profiling_middleware хранить на маршрут.
+PROFILING_WINDOW = 1000
+
+# Асинхронные страницы чтения (news.async_views) для развёртывания под ASGI
+# и размер пула потоков, в котором они обращаются к базе.
+ASYNC_READ_VIEWS = False
+ASYNC_VIEWS_THREADS = 8
+
+# PRAGMA для каждого нового соединения с SQLite (news.database);
+# боевые значения — в settings_production.
+SQLITE_PRAGMAS = {}
+# Проверять постоянные соединения (CONN_MAX_AGE) в начале запроса.
+DATABASE_HEALTH_CHECKS = False
+
+# Компилировать все шаблоны при запуске WSGI/ASGI-приложения
+# (команда precompile_templates).
+PRECOMPILE_TEMPLATES = False
@@ -0,0 +1,36 @@
+"""
+Настройки для быстрого прогона тестов.
+
+База SQLite в памяти создаётся прямо по моделям, без миграций, пароли
+хешируются MD5. Миграции с данными при этом
+не выполняются: их проверяет прогон с основными настройками.
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class DisableMigrations:
+    """Для любого приложения сообщает, что модуля миграций нет."""
+
+    def __contains__(self, app_label):
+        return True
+
+    def __getitem__(self, app_label):
+        return None
+
+
+MIGRATION_MODULES = DisableMigrations()
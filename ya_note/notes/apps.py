@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, pre_save
 
 
 class NotesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notes'
+
+    def ready(self):
+        from .database import (
+            check_connections, configure_sqlite, mark_reused_connections
+        )
+        from .models import Note
+        from .signals import fill_modified, note_deleted
+
+        connection_created.connect(configure_sqlite)
+        request_started.connect(check_connections)
+        request_finished.connect(mark_reused_connections)
+        pre_save.connect(fill_modified, sender=Note)
+        post_delete.connect(note_deleted, sender=Note)
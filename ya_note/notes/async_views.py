@@ -0,0 +1,45 @@
+"""
+Асинхронные версии страниц чтения для развёртывания под ASGI.
+
+В Django 3.2 нет асинхронного ORM, поэтому обычная страница целиком,
+вместе с отрисовкой шаблона, выполняется в отдельном пуле потоков
+ограниченного размера. Цикл событий при этом не ждёт базу, а число
+одновременных соединений с ней не превышает ASYNC_VIEWS_THREADS.
+Включаются настройкой ASYNC_READ_VIEWS.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .views import NoteDetail, NotesList
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_VIEWS_THREADS,
+    thread_name_prefix='notes-views',
+)
+
+
+def run_in_pool(view):
+    """Превращает синхронную страницу в асинхронную на общем пуле."""
+    def run(request, *args, **kwargs):
+        try:
+            response = view(request, *args, **kwargs)
+            if callable(getattr(response, 'render', None)):
+                response.render()
+            return response
+        finally:
+            # request_finished закрывает соединения только своего потока.
+            close_old_connections()
+
+    async def pooled_view(request, *args, **kwargs):
+        return await sync_to_async(
+            run, thread_sensitive=False, executor=executor
+        )(request, *args, **kwargs)
+
+    return pooled_view
+
+
+notes_list = run_in_pool(NotesList.as_view())
+note_detail = run_in_pool(NoteDetail.as_view())
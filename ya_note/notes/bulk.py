@@ -0,0 +1,218 @@
+"""
+Массовый импорт и экспорт заметок в форматах JSON Lines и CSV.
+
+Разбор файла (detect_format, read_rows) совпадает с news/loading.py
+в YaNews, почему — см. README.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from pytils.translit import slugify
+
+from .models import Note, next_free_slug, slug_prefix, taken_slugs_filter
+from .search import index_notes
+
+FORMATS = ('jsonl', 'csv')
+FIELDS = ('title', 'text', 'slug')
+BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 2000
+SLUG_MAX_LENGTH = Note._meta.get_field('slug').max_length
+
+
+def detect_format(filename):
+    """Формат файла по расширению, по умолчанию JSON Lines."""
+    return 'csv' if str(filename).lower().endswith('.csv') else 'jsonl'
+
+
+class ImportFileError(Exception):
+    """Файл нельзя разобрать целиком: он не в UTF-8 или это не CSV."""
+
+
+def read_rows(lines, file_format):
+    """
+    Построчно разбирает файл.
+
+    Возвращает пары (номер строки, словарь полей); вместо словаря
+    для нечитаемой строки возвращается текст ошибки. Если дальше
+    читать файл нельзя, выбрасывается ImportFileError.
+    """
+    try:
+        if file_format == 'csv':
+            yield from _read_csv(lines)
+        else:
+            yield from _read_jsonl(lines)
+    except UnicodeDecodeError as error:
+        raise ImportFileError(f'Файл не в кодировке UTF-8: {error}')
+
+
+def _read_csv(lines):
+    reader = csv.DictReader(lines)
+    try:
+        for row in reader:
+            yield reader.line_num, row
+    except csv.Error as error:
+        raise ImportFileError(
+            f'Некорректный CSV в строке {reader.line_num}: {error}'
+        )
+
+
+def _read_jsonl(lines):
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield line_number, f'Некорректный JSON: {error}'
+            continue
+        if not isinstance(row, dict):
+            yield line_number, 'Ожидался JSON-объект.'
+            continue
+        yield line_number, row
+
+
+class ImportResult:
+    """Итог импорта: число созданных заметок и ошибки по строкам."""
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def add_error(self, line_number, message):
+        self.errors.append({'line': line_number, 'error': message})
+
+    def as_dict(self):
+        return {'created': self.created, 'errors': self.errors}
+
+
+def import_notes(author, rows, batch_size=BATCH_SIZE):
+    """
+    Создаёт заметки из строк read_rows пачками через bulk_create.
+
+    Занятость slug проверяется одним запросом на пачку, пустой slug
+    подбирается по заголовку так же, как в Note.save().
+    """
+    result = ImportResult()
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        notes = []
+        for line_number, row in batch:
+            note = _build_note(author, line_number, row, result)
+            if note is not None:
+                notes.append((line_number, note))
+        _insert(_assign_slugs(notes, result), result)
+    return result
+
+
+def _build_note(author, line_number, row, result):
+    if isinstance(row, str):
+        result.add_error(line_number, row)
+        return None
+    note = Note(
+        author=author,
+        **{field: str(row.get(field) or '') for field in FIELDS},
+    )
+    try:
+        note.full_clean(exclude=('author',), validate_unique=False)
+    except ValidationError as error:
+        result.add_error(line_number, error.message_dict)
+        return None
+    return note
+
+
+def _assign_slugs(notes, result):
+    """
+    Подбирает свободные slug для пустых и отбрасывает занятые явные.
+
+    Возвращает тройки (номер строки, заметка, slug подобран), которые
+    можно вставлять.
+    """
+    auto_slugs = {
+        id(note): slugify(note.title)[:SLUG_MAX_LENGTH]
+        for _, note in notes if not note.slug
+    }
+    candidates = {note.slug for _, note in notes if note.slug}
+    candidates.update(auto_slugs.values())
+    taken = set(Note.objects.filter(
+        slug__in=candidates
+    ).values_list('slug', flat=True))
+    for base in set(auto_slugs.values()) & taken:
+        taken.update(Note.objects.filter(
+            taken_slugs_filter(base, SLUG_MAX_LENGTH)
+        ).values_list('slug', flat=True))
+    valid_notes = []
+    for line_number, note in notes:
+        if note.slug in taken:
+            result.add_error(
+                line_number, {'slug': [f'{note.slug} уже существует.']}
+            )
+            continue
+        auto_slug = not note.slug
+        if auto_slug:
+            base = auto_slugs[id(note)]
+            prefix = slug_prefix(base, SLUG_MAX_LENGTH)
+            note.slug = next_free_slug(
+                base,
+                {slug for slug in taken if slug.startswith(prefix)},
+                SLUG_MAX_LENGTH,
+            )
+        taken.add(note.slug)
+        valid_notes.append((line_number, note, auto_slug))
+    return valid_notes
+
+
+def _insert(notes, result):
+    """
+    Вставляет пачку одним запросом.
+
+    Если параллельный запрос успел занять один из slug, пачка
+    сохраняется по одной заметке, чтобы ошибка досталась только
+    своей строке. Подобранный slug при этом сбрасывается, и
+    Note.save() подбирает его заново.
+    """
+    if not notes:
+        return
+    try:
+        with transaction.atomic():
+            Note.objects.bulk_create(note for _, note, _ in notes)
+            index_notes(Note.objects.filter(
+                slug__in=[note.slug for _, note, _ in notes]
+            ).only('id', 'author_id', 'title', 'text'), replace=False)
+    except IntegrityError:
+        for line_number, note, auto_slug in notes:
+            if auto_slug:
+                note.slug = ''
+            try:
+                note.save()
+            except IntegrityError as error:
+                result.add_error(line_number, str(error))
+                continue
+            result.created += 1
+        return
+    result.created += len(notes)
+
+
+class Echo:
+    """Файлоподобный объект, который просто возвращает записанное."""
+
+    def write(self, value):
+        return value
+
+
+def export_notes(author, file_format):
+    """Построчно отдаёт заметки автора, не держа их все в памяти."""
+    notes = Note.objects.filter(author=author).order_by('id').values_list(
+        *FIELDS
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    if file_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(FIELDS)
+        for note in notes:
+            yield writer.writerow(note)
+        return
+    for note in notes:
+        yield json.dumps(dict(zip(FIELDS, note)), ensure_ascii=False) + '\n'
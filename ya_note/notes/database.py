@@ -0,0 +1,92 @@
+"""
+Настройка соединений с базой данных.
+
+configure_sqlite выполняет PRAGMA из настройки SQLITE_PRAGMAS для каждого
+нового соединения с SQLite. check_connections проверяет постоянные
+соединения (CONN_MAX_AGE), оставшиеся открытыми после прошлого запроса:
+в Django 3.2 нет CONN_HEALTH_CHECKS, а is_usable() у SQLite всегда
+возвращает True. Обработчики подключаются в NotesConfig.ready.
+"""
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+# PRAGMA, которые можно задать в SQLITE_PRAGMAS. Имя и значение
+# подставляются в текст запроса, поэтому оба проверяются.
+ALLOWED_PRAGMAS = frozenset((
+    'busy_timeout', 'cache_size', 'foreign_keys', 'journal_mode',
+    'mmap_size', 'synchronous', 'temp_store', 'wal_autocheckpoint',
+))
+PRAGMA_VALUE = re.compile(r'-?\w+')
+
+
+def pragma_statements(pragmas):
+    """Текст PRAGMA для настроек; неизвестное имя или значение — ошибка."""
+    statements = []
+    for name, value in pragmas.items():
+        if name not in ALLOWED_PRAGMAS:
+            raise ImproperlyConfigured(
+                f'SQLITE_PRAGMAS: PRAGMA {name!r} не разрешена, '
+                f'допустимы: {", ".join(sorted(ALLOWED_PRAGMAS))}.'
+            )
+        if not PRAGMA_VALUE.fullmatch(str(value)):
+            raise ImproperlyConfigured(
+                f'SQLITE_PRAGMAS: недопустимое значение {value!r} '
+                f'для PRAGMA {name}.'
+            )
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Обработчик connection_created.
+
+    PRAGMA выполняются напрямую через соединение sqlite3, минуя
+    execute_wrapper, поэтому не попадают в замеры запросов.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for statement in pragma_statements(settings.SQLITE_PRAGMAS):
+        connection.connection.execute(statement)
+
+
+def check_connection(connection):
+    """Закрывает соединение, если оно открыто, но уже не работает."""
+    if connection.connection is None:
+        return
+    try:
+        connection.connection.cursor().execute('SELECT 1')
+    except Exception:
+        connection.close()
+
+
+def mark_reused_connections(**kwargs):
+    """
+    Обработчик request_finished.
+
+    Подключается после close_old_connections и отмечает соединения,
+    которые остались открытыми и достанутся следующему запросу.
+    """
+    if not settings.DATABASE_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        connection.health_check_pending = connection.connection is not None
+
+
+def check_connections(**kwargs):
+    """
+    Обработчик request_started.
+
+    Проверяет только соединения, отмеченные в конце прошлого запроса.
+    Неработающее соединение закрывается, и Django откроет новое
+    при первом запросе к базе, а не вернёт ошибку пользователю.
+    """
+    if not settings.DATABASE_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if getattr(connection, 'health_check_pending', False):
+            connection.health_check_pending = False
+            check_connection(connection)
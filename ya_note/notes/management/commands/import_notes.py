@@ -0,0 +1,49 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.bulk import (
+    BATCH_SIZE, FORMATS, ImportFileError, detect_format, import_notes,
+    read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = 'Импортирует заметки пользователя из файла JSON Lines или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            author = get_user_model().objects.get(
+                username=options['username']
+            )
+        except get_user_model().DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден.'
+            )
+        file_format = options['format'] or detect_format(options['path'])
+        started = time.perf_counter()
+        with open(options['path'], encoding='utf-8', newline='') as file:
+            try:
+                result = import_notes(
+                    author,
+                    read_rows(file, file_format),
+                    batch_size=options['batch_size'],
+                )
+            except ImportFileError as error:
+                # Пачки до ошибки уже сохранены.
+                raise CommandError(f'Импорт прерван: {error}')
+        for error in result.errors:
+            self.stderr.write(json.dumps(error, ensure_ascii=False))
+        self.stdout.write(
+            f'Создано заметок: {result.created}, '
+            f'ошибок: {len(result.errors)}, '
+            f'за {time.perf_counter() - started:.1f} с'
+        )
@@ -0,0 +1,56 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+
+# Остальные файлы в каталогах шаблонов (картинки, заметки редактора)
+# не шаблоны, и компилировать их нельзя.
+TEMPLATE_SUFFIXES = ('.html', '.txt', '.xml')
+
+
+def loader_dirs(loaders):
+    """Каталоги шаблонов всех загрузчиков, включая вложенные в cached."""
+    for loader in loaders:
+        if hasattr(loader, 'loaders'):
+            yield from loader_dirs(loader.loaders)
+        elif hasattr(loader, 'get_dirs'):
+            yield from loader.get_dirs()
+
+
+def template_names(engine):
+    """Имена шаблонов движка в порядке поиска загрузчиками."""
+    names = {}
+    for directory in loader_dirs(engine.engine.template_loaders):
+        directory = Path(directory)
+        for path in sorted(directory.rglob('*')):
+            if path.is_file() and path.suffix in TEMPLATE_SUFFIXES:
+                names.setdefault(path.relative_to(directory).as_posix())
+    return list(names)
+
+
+class Command(BaseCommand):
+    help = (
+        'Компилирует все шаблоны, чтобы проверить их и заполнить кэш '
+        'загрузчика до первого запроса.'
+    )
+
+    def handle(self, *args, **options):
+        compiled = 0
+        errors = []
+        for engine in engines.all():
+            if not isinstance(engine, DjangoTemplates):
+                continue
+            for name in template_names(engine):
+                try:
+                    engine.get_template(name)
+                except (TemplateSyntaxError, UnicodeDecodeError) as error:
+                    errors.append(f'{name}: {error}')
+                else:
+                    compiled += 1
+        for error in errors:
+            self.stderr.write(error)
+        if errors:
+            raise CommandError(f'Шаблонов с ошибками: {len(errors)}')
+        if options['verbosity']:
+            self.stdout.write(f'Скомпилировано шаблонов: {compiled}')
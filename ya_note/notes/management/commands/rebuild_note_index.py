@@ -0,0 +1,25 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes.models import Note
+from notes.search import clear_index, index_notes
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс по всем заметкам.'
+
+    def handle(self, *args, **options):
+        notes = Note.objects.only(
+            'id', 'author_id', 'title', 'text'
+        ).iterator(chunk_size=BATCH_SIZE)
+        indexed = 0
+        with transaction.atomic():
+            clear_index()
+            while batch := list(islice(notes, BATCH_SIZE)):
+                index_notes(batch, replace=False)
+                indexed += len(batch)
+        self.stdout.write(f'Проиндексировано заметок: {indexed}')
@@ -0,0 +1,60 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:09
+
+from django.conf import settings
+from django.db import migrations, models, transaction
+from django.db.utils import OperationalError
+import django.db.models.deletion
+
+FTS_TABLE = 'notes_note_fts'
+
+
+def create_fts_table(apps, schema_editor):
+    """Создаёт таблицу FTS5, если SQLite собран с её поддержкой."""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE {FTS_TABLE} '
+                    'USING fts5(author, title, text)'
+                )
+    except OperationalError:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, author, title, text) '
+            "SELECT id, 'u' || author_id, title, text FROM notes_note"
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0002_note_modified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='notes.note')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='noteterm',
+            index=models.Index(fields=['author', 'term', 'note'], name='note_term_author_idx'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
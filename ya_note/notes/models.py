@@ -1,8 +1,56 @@
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q
 
 from pytils.translit import slugify
 
+SLUG_ATTEMPTS = 10
+# Самый длинный номер «-N», под который может укорачиваться slug.
+MAX_SLUG_SUFFIX_LENGTH = 20
+
+
+def numbered_slug(base, number, max_length):
+    """base с номером; base укорачивается, чтобы номер поместился."""
+    suffix = f'-{number}'
+    return base[:max_length - len(suffix)] + suffix
+
+
+def slug_prefix(base, max_length):
+    """Общее начало base и всех его вариантов с номером."""
+    return base[:max_length - MAX_SLUG_SUFFIX_LENGTH]
+
+
+def taken_slugs_filter(base, max_length):
+    """
+    Условие на slug, под которое попадают base и все его варианты с номером.
+
+    Если base вместе с номером не помещается в max_length, варианты
+    различаются не только номером, и выбираются все slug с общим началом.
+    """
+    if len(base) <= max_length - MAX_SLUG_SUFFIX_LENGTH:
+        return Q(slug=base) | Q(slug__gt=base + '-', slug__lt=base + '.')
+    prefix = slug_prefix(base, max_length)
+    # Символы slug — ASCII, все они меньше DEL.
+    return Q(slug__gte=prefix, slug__lt=prefix + '\x7f')
+
+
+def next_free_slug(base, taken_slugs, max_length):
+    """
+    Первый свободный slug вида base, base-2, base-3, …
+
+    taken_slugs — уже занятые slug, выбранные по taken_slugs_filter.
+    """
+    if base not in taken_slugs:
+        return base
+    numbers = []
+    for slug in taken_slugs:
+        number = slug.rpartition('-')[2]
+        if number.isdigit() and slug == numbered_slug(
+            base, int(number), max_length
+        ):
+            numbers.append(int(number))
+    return numbered_slug(base, max(numbers, default=1) + 1, max_length)
+
 
 class Note(models.Model):
     title = models.CharField(
@@ -27,12 +75,73 @@ class Note(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    modified = models.DateTimeField('Дата изменения', auto_now=True)
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        from .search import index_notes
+
+        adding = self._state.adding
+        with transaction.atomic(using=kwargs.get('using')):
+            if self.slug:
+                super().save(*args, **kwargs)
+            else:
+                self._save_with_free_slug(*args, **kwargs)
+            index_notes([self], replace=not adding, using=self._state.db)
+
+    def _save_with_free_slug(self, *args, **kwargs):
+        """
+        Сохраняет заметку со slug из заголовка, добавляя номер при повторе.
+
+        Обычно это один INSERT: уникальность проверяет сама база.
+        При конфликте одним запросом читаются занятые варианты slug
+        и берётся следующий номер; если его успел занять параллельный
+        запрос, попытка повторяется.
+        """
+        max_slug_length = self._meta.get_field('slug').max_length
+        base = slugify(self.title)[:max_slug_length]
+        self.slug = base
+        for attempt in range(SLUG_ATTEMPTS):
+            try:
+                with transaction.atomic(using=kwargs.get('using')):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                taken_slugs = set(
+                    Note.objects.filter(
+                        taken_slugs_filter(base, max_slug_length)
+                    ).values_list('slug', flat=True)
+                )
+                if self.slug not in taken_slugs:
+                    raise
+                self.slug = next_free_slug(
+                    base, taken_slugs, max_slug_length
+                )
+        raise IntegrityError(f'Не удалось подобрать slug для {base}')
+
+
+class NoteTerm(models.Model):
+    """
+    Запись обратного индекса: слово и число его вхождений в заметку.
+
+    Используется для поиска, когда в SQLite нет FTS5.
+    """
+    note = models.ForeignKey(Note, on_delete=models.CASCADE)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    term = models.CharField(max_length=100)
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('author', 'term', 'note'),
+                name='note_term_author_idx',
+            ),
+        )
+
+    def __str__(self):
+        return self.term
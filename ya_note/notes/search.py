@@ -0,0 +1,217 @@
+"""
+Полнотекстовый поиск по заметкам пользователя.
+
+Если SQLite собран с FTS5 и миграция создала таблицу notes_note_fts,
+поиск идёт по ней. Иначе используется обратный индекс в таблице
+NoteTerm. В обоих случаях индекс обновляется при сохранении и удалении
+заметки, в том числе каскадном (обработчик post_delete в notes.signals),
+а поиск читает только записи для слов из запроса. Запросы к таблице
+FTS5 идут в ту базу, которую маршрутизатор выбирает для Note.
+"""
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Count, Sum
+
+from .models import Note, NoteTerm
+
+FTS_TABLE = 'notes_note_fts'
+WORD = re.compile(r'\w+')
+TITLE_WEIGHT = 2
+MAX_TERM_LENGTH = NoteTerm._meta.get_field('term').max_length
+
+_fts_available = {}
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре."""
+    return [
+        word[:MAX_TERM_LENGTH] for word in WORD.findall(text.lower())
+    ]
+
+
+def get_connection(using=None, write=True):
+    """Соединение с базой, где лежат заметки и их индекс."""
+    if using is None:
+        using = (
+            router.db_for_write(Note) if write else router.db_for_read(Note)
+        )
+    return connections[using]
+
+
+def use_fts(using=None):
+    """
+    Выбирает движок поиска по настройке NOTES_SEARCH_BACKEND.
+
+    В режиме auto наличие таблицы FTS5 проверяется один раз
+    для каждой базы данных.
+    """
+    backend = getattr(settings, 'NOTES_SEARCH_BACKEND', 'auto')
+    if backend != 'auto':
+        return backend == 'fts5'
+    connection = get_connection(using)
+    database = connection.settings_dict['NAME']
+    if database not in _fts_available:
+        _fts_available[database] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available[database]
+
+
+def _author_token(author_id):
+    return f'u{author_id}'
+
+
+def index_notes(notes, replace=True, using=None):
+    """
+    Добавляет заметки в индекс, заменяя прежние записи о них.
+
+    Для только что созданных заметок прежних записей нет, и с
+    replace=False лишний DELETE не выполняется.
+    """
+    notes = list(notes)
+    if not notes:
+        return
+    if replace:
+        unindex_notes([note.pk for note in notes], using=using)
+    if use_fts(using):
+        with get_connection(using).cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, author, title, text) '
+                'VALUES (%s, %s, %s, %s)',
+                [
+                    (note.pk, _author_token(note.author_id),
+                     note.title, note.text)
+                    for note in notes
+                ],
+            )
+        return
+    NoteTerm.objects.db_manager(using).bulk_create(
+        NoteTerm(
+            note_id=note.pk, author_id=note.author_id, term=term, count=count
+        )
+        for note in notes
+        for term, count in _term_counts(note).items()
+    )
+
+
+def _term_counts(note):
+    counts = Counter(tokenize(note.text))
+    for term in tokenize(note.title):
+        counts[term] += TITLE_WEIGHT
+    return counts
+
+
+def unindex_notes(note_ids, using=None):
+    """Удаляет заметки из индекса."""
+    note_ids = list(note_ids)
+    if use_fts(using):
+        with get_connection(using).cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(note_id,) for note_id in note_ids],
+            )
+    else:
+        NoteTerm.objects.db_manager(using).filter(
+            note_id__in=note_ids
+        ).delete()
+
+
+def clear_index(using=None):
+    """Удаляет из индекса все заметки."""
+    if use_fts(using):
+        with get_connection(using).cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        NoteTerm.objects.db_manager(using).all().delete()
+
+
+def search_notes(author, query):
+    """Заметки автора, содержащие все слова запроса, лучшие первыми."""
+    terms = list(dict.fromkeys(tokenize(query)))
+    if use_fts():
+        return FtsResults(author, terms)
+    return TermResults(author, terms)
+
+
+class SearchResults:
+    """
+    Ленивый результат поиска для Paginator.
+
+    Считает совпадения и достаёт нужную страницу отдельными запросами,
+    не загружая все найденные заметки.
+    """
+
+    def __init__(self, author, terms):
+        self.author = author
+        self.terms = terms
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        if not self.terms:
+            return []
+        start = key.start or 0
+        note_ids = self.get_ids(start, key.stop - start)
+        notes = Note.objects.only('id', 'slug', 'title').in_bulk(note_ids)
+        return [notes[note_id] for note_id in note_ids if note_id in notes]
+
+    def count(self):
+        return self.get_count() if self.terms else 0
+
+
+class FtsResults(SearchResults):
+    """Поиск по таблице FTS5 с ранжированием bm25."""
+
+    def match(self):
+        words = ' AND '.join(f'"{term}"' for term in self.terms)
+        return (
+            f'author : {_author_token(self.author.pk)} '
+            f'AND {{title text}} : ({words})'
+        )
+
+    def get_count(self):
+        with get_connection(write=False).cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [self.match()],
+            )
+            return cursor.fetchone()[0]
+
+    def get_ids(self, offset, limit):
+        with get_connection(write=False).cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, 0, {TITLE_WEIGHT}, 1), rowid '
+                'LIMIT %s OFFSET %s',
+                [self.match(), limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class TermResults(SearchResults):
+    """Поиск по таблице NoteTerm: ранг — суммарное число вхождений."""
+
+    def matches(self):
+        return NoteTerm.objects.filter(
+            author=self.author, term__in=self.terms
+        ).values('note').annotate(
+            matched=Count('term'), score=Sum('count')
+        ).filter(matched=len(self.terms))
+
+    def get_count(self):
+        return self.matches().count()
+
+    def get_ids(self, offset, limit):
+        return list(
+            self.matches().order_by('-score', 'note').values_list(
+                'note', flat=True
+            )[offset:offset + limit]
+        )
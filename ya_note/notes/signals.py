@@ -0,0 +1,33 @@
+"""
+Обработчики сигналов заметок.
+
+Таблица FTS5 не связана с заметками внешним ключом, поэтому записи
+о заметке удаляет обработчик post_delete. Он срабатывает и при
+QuerySet.delete(), и при каскадном удалении вместе с пользователем.
+Обработчики подключаются в NotesConfig.ready.
+"""
+from django.utils import timezone
+
+from .search import unindex_notes, use_fts
+
+
+def fill_modified(sender, instance, raw, **kwargs):
+    """
+    Обработчик pre_save для Note: дата изменения для loaddata.
+
+    loaddata сохраняет объекты в режиме raw, и auto_now не срабатывает,
+    а в фикстурах, снятых до появления поля, его нет. default вместе
+    с auto_now Django не разрешает (fields.E160).
+    """
+    if raw and instance.modified is None:
+        instance.modified = timezone.now()
+
+
+def note_deleted(sender, instance, using, **kwargs):
+    """
+    Удаляет заметку из таблицы FTS5.
+
+    Записи обратного индекса NoteTerm удалит каскад внешнего ключа.
+    """
+    if use_fts(using):
+        unindex_notes([instance.pk], using=using)
@@ -0,0 +1,50 @@
+from django.db import connection
+
+from notes.tests.factories import reset_sequences, sequences
+from yanote.profiling import QueryRecorder
+
+
+class FactoryMixin:
+    """
+    Нумерация фабрик для TestCase, не зависящая от порядка тестов.
+
+    Для каждого класса она начинается заново, а каждый тест продолжает
+    её с того места, где остановился setUpTestData.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        reset_sequences()
+        super().setUpClass()
+        cls.factory_sequences = dict(sequences)
+
+    def setUp(self):
+        super().setUp()
+        reset_sequences(self.factory_sequences)
+
+
+class QueryBudgetMixin:
+    """Проверка лимитов на SQL-запросы и размер ответа для TestCase."""
+
+    def assertBudget(self, url, max_queries, max_bytes):
+        """
+        Запрашивает страницу клиентом теста и проверяет лимиты.
+
+        При превышении лимита запросов выводит их SQL по местам вызова.
+        """
+        recorder = QueryRecorder(record_callsites=True)
+        with connection.execute_wrapper(recorder):
+            response = self.client.get(url)
+        self.assertLessEqual(
+            recorder.count,
+            max_queries,
+            f'{url}: {recorder.count} SQL-запросов при лимите '
+            f'{max_queries}\n{recorder.format_queries()}',
+        )
+        self.assertLessEqual(
+            len(response.content),
+            max_bytes,
+            f'{url}: ответ {len(response.content)} байт при лимите '
+            f'{max_bytes}',
+        )
+        return response
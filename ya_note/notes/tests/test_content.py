@@ -1,13 +1,33 @@
+from http import HTTPStatus
+
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import (
+    AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+)
 from django.urls import reverse
 
-from notes.models import Note
+from notes import async_views
+from notes.models import Note, NoteTerm
+from notes.search import FTS_TABLE, get_connection, use_fts
+from notes.tests.factories import NoteFactory
+from notes.tests.mixins import FactoryMixin
+from notes.views import NotesSearch
+from yanote.profiling import QueryRecorder, record_queries
 
 
 User = get_user_model()
 
 
+def indexed_note_ids():
+    """Id заметок, о которых есть записи в поисковом индексе."""
+    if not use_fts():
+        return set(NoteTerm.objects.values_list('note_id', flat=True))
+    with get_connection().cursor() as cursor:
+        cursor.execute(f'SELECT rowid FROM {FTS_TABLE}')
+        return {row[0] for row in cursor.fetchall()}
+
+
 class TestContent(TestCase):
 
     @classmethod
@@ -45,3 +65,157 @@ class TestContent(TestCase):
                 url = reverse(name, args=args)
                 response = self.client.get(url)
                 self.assertIn('form', response.context)
+
+
+class TestSearch(FactoryMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.not_author = User.objects.create(username='Не автор')
+        cls.pie = Note.objects.create(
+            title='Рецепт пирога',
+            text='Мука, яйца, сахар и немного молока.',
+            author=cls.author,
+            slug='pie',
+        )
+        cls.shopping = Note.objects.create(
+            title='Список покупок',
+            text='Мука, молоко, рецепт не нужен.',
+            author=cls.author,
+            slug='shopping',
+        )
+        Note.objects.create(
+            title='Рецепт пирога',
+            text='Чужая заметка',
+            author=cls.not_author,
+            slug='other-pie',
+        )
+        cls.url = reverse('notes:search')
+
+    def search(self, query, **params):
+        self.client.force_login(self.author)
+        response = self.client.get(self.url, {'q': query, **params})
+        return list(response.context['object_list'])
+
+    def test_search_finds_only_authors_notes_with_all_terms(self):
+        self.assertEqual(self.search('мука молоко'), [self.shopping])
+        self.assertEqual(self.search('пирога'), [self.pie])
+        self.assertEqual(self.search(''), [])
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('рецепт'), [self.pie, self.shopping])
+
+    def test_search_is_paginated(self):
+        NoteFactory().create_batch(
+            NotesSearch.paginate_by,
+            title=lambda index: f'Мука {index}',
+            author=self.author,
+        )
+        self.assertEqual(len(self.search('мука')), NotesSearch.paginate_by)
+        self.assertEqual(len(self.search('мука', page=2)), 2)
+
+    def test_index_follows_edit_and_delete(self):
+        self.pie.title = 'Рецепт торта'
+        self.pie.save()
+        self.assertEqual(self.search('пирога'), [])
+        self.assertEqual(self.search('торта'), [self.pie])
+        self.pie.delete()
+        self.assertEqual(self.search('торта'), [])
+
+    def test_index_follows_cascade_delete(self):
+        self.author.delete()
+        self.assertEqual(indexed_note_ids(), {
+            note.pk for note in Note.objects.all()
+        })
+
+
+@override_settings(NOTES_SEARCH_BACKEND='python')
+class TestSearchWithoutFts(TestSearch):
+    pass
+
+
+@override_settings(NOTES_COUNT_ON_LIST_PAGE=2, NOTES_MAX_PAGE_SIZE=3)
+class TestNotesList(FactoryMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.notes = NoteFactory().create_batch(4, author=cls.author)
+        cls.url = reverse('notes:list')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.author)
+
+    def test_list_is_paginated(self):
+        response = self.client.get(self.url, {'page': 2})
+        self.assertEqual(
+            list(response.context['object_list']), self.notes[2:]
+        )
+
+    def test_page_size_is_selectable_and_limited(self):
+        page_sizes = ((1, 1), (3, 3), (100, 3), ('abc', 2))
+        for page_size, expected_count in page_sizes:
+            with self.subTest(page_size=page_size):
+                response = self.client.get(
+                    self.url, {'page_size': page_size}
+                )
+                object_list = response.context['object_list']
+                self.assertEqual(len(object_list), expected_count)
+
+    def test_keyset_mode_continues_after_cursor(self):
+        response = self.client.get(self.url, {'after': self.notes[0].pk})
+        self.assertEqual(
+            list(response.context['object_list']), self.notes[1:3]
+        )
+        next_after = response.context['next_after']
+        self.assertEqual(next_after, self.notes[2].pk)
+        response = self.client.get(self.url, {'after': next_after})
+        self.assertEqual(
+            list(response.context['object_list']), self.notes[3:]
+        )
+        self.assertIsNone(response.context['next_after'])
+
+    def test_keyset_mode_rejects_invalid_cursor(self):
+        for after in ('not-a-cursor', '-1', '99999999999999999999'):
+            with self.subTest(after=after):
+                response = self.client.get(self.url, {'after': after})
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_list_does_not_load_note_text(self):
+        response = self.client.get(self.url)
+        for note in response.context['object_list']:
+            with self.subTest(note=note):
+                self.assertIn('text', note.get_deferred_fields())
+
+
+class TestAsyncReadViews(TransactionTestCase):
+    """Асинхронные страницы работают в пуле потоков с отдельным соединением."""
+
+    def setUp(self):
+        self.author = User.objects.create(username='Автор')
+        self.note = Note.objects.create(
+            title='Заголовок', text='Текст', slug='note', author=self.author
+        )
+        self.factory = AsyncRequestFactory()
+
+    def get(self, view, url, **kwargs):
+        request = self.factory.get(url)
+        request.user = self.author
+        with record_queries(QueryRecorder()) as recorder:
+            response = async_to_sync(view)(request, **kwargs)
+        self.assertGreater(recorder.count, 0)
+        return response
+
+    def test_notes_list(self):
+        response = self.get(async_views.notes_list, reverse('notes:list'))
+        self.assertIn(self.note.title, response.content.decode())
+
+    def test_note_detail(self):
+        response = self.get(
+            async_views.note_detail,
+            reverse('notes:detail', args=(self.note.slug,)),
+            slug=self.note.slug,
+        )
+        self.assertIn(self.note.text, response.content.decode())
@@ -1,25 +1,44 @@
+import json
 from http import HTTPStatus
+from io import StringIO
+from pathlib import Path
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from threading import Thread
+from time import sleep
+from unittest.mock import patch
 from pytils.translit import slugify
 
-from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.template import engines
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
 from django.urls import reverse
 
+from notes.database import (
+    check_connection, check_connections, mark_reused_connections,
+    pragma_statements
+)
 from notes.models import Note
+from notes.search import search_notes
 from notes.forms import WARNING
+from notes.tests.factories import NoteFactory, UserFactory
+from notes.tests.mixins import FactoryMixin
+from yanote.settings_production import TEMPLATES as PRODUCTION_TEMPLATES
 
 
-User = get_user_model()
-
-
-class TestCreateNote(TestCase):
+class TestCreateNote(FactoryMixin, TestCase):
     TITLE = 'Название заметки'
     TEXT = 'Текст заметки'
     SLUG = 'note_slug'
 
     @classmethod
     def setUpTestData(cls):
-        cls.user = User.objects.create(username='Пользователь')
+        cls.user = UserFactory().create()
         cls.auth_client = Client()
         cls.auth_client.force_login(cls.user)
         cls.success_url = reverse('notes:success')
@@ -66,7 +85,7 @@ class TestCreateNote(TestCase):
         self.assertEqual(new_note.slug, expected_slug)
 
 
-class TestEditDeleteNote(TestCase):
+class TestEditDeleteNote(FactoryMixin, TestCase):
     TITLE = 'Название заметки'
     TEXT = 'Текст заметки'
     SLUG = 'note_slug'
@@ -76,14 +95,13 @@ class TestEditDeleteNote(TestCase):
 
     @classmethod
     def setUpTestData(cls):
-        cls.user = User.objects.create(username='Пользователь')
-        cls.other_user = User.objects.create(username='Другой пользователь')
+        cls.user, cls.other_user = UserFactory().create_batch(2)
         cls.auth_client = Client()
         cls.auth_client.force_login(cls.user)
-        cls.note = Note.objects.create(title=cls.TITLE,
-                                       text=cls.TEXT,
-                                       slug=cls.SLUG,
-                                       author=cls.user)
+        cls.note = NoteFactory().create(title=cls.TITLE,
+                                        text=cls.TEXT,
+                                        slug=cls.SLUG,
+                                        author=cls.user)
         cls.success_url = reverse('notes:success')
         cls.edit_url = reverse('notes:edit', args=(cls.note.slug,))
         cls.delete_url = reverse('notes:delete', args=(cls.note.slug,))
@@ -139,3 +157,349 @@ class TestEditDeleteNote(TestCase):
         count_after_creating = Note.objects.count()
         count_difference = count_after_creating - count_before_creating
         self.assertEqual(count_difference, 0)
+
+
+@override_settings(NOTES_SEARCH_BACKEND='python')
+class TestWriteQueries(FactoryMixin, TestCase):
+    """
+    Каждая запись делает только необходимые запросы.
+
+    Поиск переключён на обратный индекс, чтобы число запросов
+    не зависело от наличия FTS5 в SQLite.
+    """
+    # Сессия и пользователь, проверка slug, SAVEPOINT, INSERT,
+    # запись слов в индекс, RELEASE SAVEPOINT.
+    CREATE_QUERIES = 7
+    # Без slug проверки нет, а SAVEPOINT вокруг INSERT два.
+    CREATE_WITHOUT_SLUG_QUERIES = 8
+    # Сессия и пользователь, заметка, проверка slug, SAVEPOINT,
+    # UPDATE, замена слов в индексе, RELEASE SAVEPOINT.
+    EDIT_QUERIES = 9
+    # Сессия и пользователь, заметка, удаление слов каскадом и самой
+    # заметки; Collector не ставит точку сохранения.
+    DELETE_QUERIES = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory().create()
+        cls.note = NoteFactory().create(author=cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def assertPostQueries(self, number, url, data):
+        with self.assertNumQueries(number):
+            response = self.client.post(url, data)
+        self.assertRedirects(
+            response, reverse('notes:success'), fetch_redirect_response=False
+        )
+
+    def test_create(self):
+        self.assertPostQueries(self.CREATE_QUERIES, reverse('notes:add'), {
+            'title': 'Новая', 'text': 'Текст', 'slug': 'new',
+        })
+
+    def test_create_without_slug(self):
+        self.assertPostQueries(
+            self.CREATE_WITHOUT_SLUG_QUERIES,
+            reverse('notes:add'),
+            {'title': 'Новая', 'text': 'Текст', 'slug': ''},
+        )
+
+    def test_edit(self):
+        self.assertPostQueries(
+            self.EDIT_QUERIES,
+            reverse('notes:edit', args=(self.note.slug,)),
+            {'title': 'Правка', 'text': 'Текст', 'slug': self.note.slug},
+        )
+
+    def test_delete(self):
+        self.assertPostQueries(
+            self.DELETE_QUERIES,
+            reverse('notes:delete', args=(self.note.slug,)),
+            {},
+        )
+
+
+def create_note(title, author):
+    # У тестовой базы SQLite в памяти нет ожидания блокировки,
+    # поэтому поток сам повторяет запись, пока таблица занята.
+    while True:
+        try:
+            return Note.objects.create(
+                title=title, text='Текст', author=author
+            )
+        except OperationalError as error:
+            if 'locked' not in str(error):
+                raise
+            sleep(0.001)
+
+
+def create_notes(title, author, count, errors):
+    try:
+        for _ in range(count):
+            create_note(title, author)
+    except Exception as error:
+        errors.append(error)
+    finally:
+        connection.close()
+
+
+class TestSlugAllocation(FactoryMixin, TransactionTestCase):
+    TITLE = 'Одинаковый заголовок'
+    THREADS = 8
+    NOTES_PER_THREAD = 5
+
+    def setUp(self):
+        super().setUp()
+        self.user = UserFactory().create()
+
+    def test_repeated_titles_get_numbered_slugs(self):
+        self.client.force_login(self.user)
+        form_data = {'title': self.TITLE, 'text': 'Текст заметки'}
+        for _ in range(3):
+            response = self.client.post(reverse('notes:add'), data=form_data)
+            self.assertRedirects(response, reverse('notes:success'))
+        base = slugify(self.TITLE)
+        self.assertEqual(
+            set(Note.objects.values_list('slug', flat=True)),
+            {base, f'{base}-2', f'{base}-3'},
+        )
+
+    def test_long_titles_get_truncated_numbered_slugs(self):
+        self.client.force_login(self.user)
+        form_data = {'title': 'щ' * 100, 'text': 'Текст заметки'}
+        for _ in range(11):
+            response = self.client.post(reverse('notes:add'), data=form_data)
+            self.assertRedirects(response, reverse('notes:success'))
+        max_length = Note._meta.get_field('slug').max_length
+        base = slugify(form_data['title'])[:max_length]
+        self.assertEqual(
+            set(Note.objects.values_list('slug', flat=True)),
+            {base} | {
+                base[:max_length - len(f'-{number}')] + f'-{number}'
+                for number in range(2, 12)
+            },
+        )
+
+    def test_concurrent_creates_get_unique_slugs(self):
+        errors = []
+        threads = [
+            Thread(target=create_notes, args=(
+                self.TITLE, self.user, self.NOTES_PER_THREAD, errors
+            ))
+            for _ in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        slugs = list(Note.objects.values_list('slug', flat=True))
+        self.assertEqual(len(slugs), self.THREADS * self.NOTES_PER_THREAD)
+        self.assertEqual(len(set(slugs)), len(slugs))
+
+
+class TestImportExport(FactoryMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory().create()
+        cls.note = NoteFactory().create(
+            title='Старая заметка', text='Текст', slug='old', author=cls.user
+        )
+        cls.import_url = reverse('notes:import')
+        cls.export_url = reverse('notes:export')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def post_file(self, content, file_format):
+        upload = SimpleUploadedFile(f'notes.{file_format}', content)
+        return self.client.post(
+            self.import_url, {'file': upload, 'format': file_format}
+        )
+
+    def upload(self, content, file_format):
+        return self.post_file(content.encode('utf-8'), file_format).json()
+
+    def test_jsonl_import_reports_errors_per_row(self):
+        content = '\n'.join((
+            json.dumps({'title': 'Первая', 'text': 'Текст', 'slug': 'first'}),
+            '{не json',
+            json.dumps({'title': 'Без текста', 'slug': 'no_text'}),
+            json.dumps({'title': 'Повтор', 'text': 'Текст', 'slug': 'old'}),
+            json.dumps({'title': 'Старая заметка', 'text': 'Текст'}),
+            json.dumps({'title': 'Старая заметка', 'text': 'Текст'}),
+        ))
+        result = self.upload(content, 'jsonl')
+        self.assertEqual(result['created'], 3)
+        self.assertEqual(
+            [error['line'] for error in result['errors']], [2, 3, 4]
+        )
+        base = slugify('Старая заметка')
+        self.assertEqual(
+            [note.slug for note in search_notes(self.user, 'первая')[:10]],
+            ['first'],
+        )
+        self.assertEqual(
+            set(Note.objects.filter(
+                slug__startswith=base
+            ).values_list('slug', flat=True)),
+            {base, f'{base}-2'},
+        )
+
+    def test_csv_import(self):
+        content = 'title,text,slug\nИз CSV,"Текст, с запятой",from_csv\n'
+        result = self.upload(content, 'csv')
+        self.assertEqual(result, {'created': 1, 'errors': []})
+        note = Note.objects.get(slug='from_csv')
+        self.assertEqual(note.text, 'Текст, с запятой')
+        self.assertEqual(note.author, self.user)
+
+    def test_unreadable_file_is_a_form_error(self):
+        files = (
+            ('Заметка'.encode('cp1251') + b',text\n', 'csv'),
+            (
+                json.dumps({'title': 'Первая', 'text': 'Текст'}).encode()
+                + b'\n\xff\n',
+                'jsonl',
+            ),
+            (f'title,text\nДлинная,"{"x" * 200_000}"\n'.encode(), 'csv'),
+        )
+        for content, file_format in files:
+            with self.subTest(file_format=file_format):
+                response = self.post_file(content, file_format)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn('file', response.context['form'].errors)
+                self.assertEqual(Note.objects.count(), 1)
+
+    def test_taken_auto_slug_is_reassigned_on_retry(self):
+        # Параллельный запрос занял подобранный slug до вставки пачки.
+        with patch('notes.bulk.next_free_slug', return_value='old'):
+            result = self.upload(
+                json.dumps({'title': 'Старая заметка', 'text': 'Текст'}),
+                'jsonl',
+            )
+        self.assertEqual(result, {'created': 1, 'errors': []})
+        self.assertTrue(Note.objects.filter(
+            slug=slugify('Старая заметка')
+        ).exists())
+
+    def test_export_streams_users_notes(self):
+        for file_format in ('jsonl', 'csv'):
+            with self.subTest(file_format=file_format):
+                response = self.client.get(
+                    self.export_url, {'format': file_format}
+                )
+                self.assertTrue(response.streaming)
+                content = b''.join(response.streaming_content).decode()
+                self.assertIn(self.note.slug, content)
+                self.assertIn(self.note.title, content)
+
+    def test_fixture_without_modified_loads(self):
+        with NamedTemporaryFile('w', suffix='.json', encoding='utf-8') as file:
+            json.dump([{
+                'model': 'notes.note',
+                'fields': {
+                    'title': 'Из фикстуры', 'text': 'Текст',
+                    'slug': 'from_fixture', 'author': self.user.pk,
+                },
+            }], file)
+            file.flush()
+            call_command('loaddata', file.name, verbosity=0)
+        self.assertIsNotNone(Note.objects.get(slug='from_fixture').modified)
+
+    def test_import_command(self):
+        with NamedTemporaryFile('w', suffix='.csv', encoding='utf-8') as file:
+            file.write('title,text,slug\nИз команды,Текст,from_command\n')
+            file.flush()
+            call_command(
+                'import_notes', self.user.username, file.name,
+                stdout=StringIO(), stderr=StringIO(),
+            )
+        self.assertTrue(Note.objects.filter(slug='from_command').exists())
+
+
+class TestDatabaseConnection(TestCase):
+
+    @override_settings(SQLITE_PRAGMAS={'synchronous': 'OFF'})
+    def test_new_connection_gets_pragmas_and_health_checks(self):
+        # Соединение с базой в памяти SQLite не закрывается вовсе.
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        new_connection = DatabaseWrapper({
+            **connections['default'].settings_dict,
+            'NAME': str(Path(directory.name) / 'db.sqlite3'),
+        })
+        self.addCleanup(new_connection.close)
+        with new_connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone(), (0,))
+        check_connection(new_connection)
+        self.assertIsNotNone(new_connection.connection)
+        new_connection.connection.close()
+        check_connection(new_connection)
+        self.assertIsNone(new_connection.connection)
+
+    def test_sqlite_pragmas_are_validated(self):
+        self.assertEqual(
+            pragma_statements({'busy_timeout': 5000}),
+            ['PRAGMA busy_timeout = 5000'],
+        )
+        for pragmas in (
+            {'writable_schema': 'ON'},
+            {'journal_mode': 'WAL; DELETE FROM notes_note'},
+        ):
+            with self.subTest(pragmas=pragmas):
+                with self.assertRaises(ImproperlyConfigured):
+                    pragma_statements(pragmas)
+
+    @override_settings(DATABASE_HEALTH_CHECKS=True)
+    def test_health_checks_only_connections_left_by_previous_request(self):
+        connections['default'].ensure_connection()
+        with patch('notes.database.check_connection') as check:
+            # Соединение открыто не в ходе запроса.
+            check_connections()
+            check.assert_not_called()
+            mark_reused_connections()
+            check_connections()
+            check.assert_any_call(connections['default'])
+            calls = check.call_count
+            # Проверка — одна на запрос.
+            check_connections()
+            self.assertEqual(check.call_count, calls)
+
+
+class TestPrecompileTemplates(TestCase):
+
+    @override_settings(TEMPLATES=PRODUCTION_TEMPLATES)
+    def test_templates_are_compiled_into_cache(self):
+        output = StringIO()
+        call_command('precompile_templates', stdout=output)
+        self.assertIn('Скомпилировано шаблонов', output.getvalue())
+        cached_loader, = engines['django'].engine.template_loaders
+        self.assertIn('notes/list.html', cached_loader.get_template_cache)
+
+    def test_broken_template_is_reported(self):
+        with TemporaryDirectory() as directory:
+            Path(directory, 'broken.html').write_text(
+                '{% if %}', encoding='utf-8'
+            )
+            Path(directory, 'cp1251.html').write_bytes(
+                'Заметка'.encode('cp1251')
+            )
+            Path(directory, 'logo.png').write_bytes(b'\x89PNG\r\n\x1a\n\xff')
+            errors = StringIO()
+            with override_settings(TEMPLATES=[
+                {**PRODUCTION_TEMPLATES[0], 'DIRS': [directory]}
+            ]):
+                with self.assertRaisesMessage(
+                    CommandError, 'Шаблонов с ошибками: 2'
+                ):
+                    call_command('precompile_templates', stderr=errors)
+        self.assertIn('broken.html', errors.getvalue())
+        self.assertIn('cp1251.html', errors.getvalue())
+        self.assertNotIn('logo.png', errors.getvalue())
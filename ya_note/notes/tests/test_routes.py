@@ -1,15 +1,34 @@
 from http import HTTPStatus
 
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import AsyncClient, TestCase
 from django.urls import reverse
 
 from notes.models import Note
+from notes.tests.mixins import QueryBudgetMixin
+from yanote.profiling import request_stats
 
 User = get_user_model()
 
+# Лимиты на число SQL-запросов и размер ответа в байтах.
+ROUTE_BUDGETS = {
+    'notes:home': (2, 5_000),
+    'notes:list': (4, 10_000),
+    'notes:add': (2, 5_000),
+    'notes:success': (2, 5_000),
+    'notes:edit': (3, 5_000),
+    'notes:detail': (4, 5_000),
+    'notes:delete': (3, 5_000),
+    'users:login': (2, 5_000),
+    'users:logout': (4, 5_000),
+    'users:signup': (2, 5_000),
+}
+# Анонимного пользователя перенаправляют, не обращаясь к базе.
+REDIRECT_BUDGET = (0, 0)
 
-class TestRoutes(TestCase):
+
+class TestRoutes(QueryBudgetMixin, TestCase):
 
     @classmethod
     def setUpTestData(cls):
@@ -27,7 +46,7 @@ class TestRoutes(TestCase):
         for name in urls:
             with self.subTest(name=name):
                 url = reverse(name)
-                response = self.client.get(url)
+                response = self.assertBudget(url, *ROUTE_BUDGETS[name])
                 self.assertEqual(response.status_code, HTTPStatus.OK)
 
     def test_pages_availability_for_auth_user(self):
@@ -43,7 +62,7 @@ class TestRoutes(TestCase):
         for name in urls:
             with self.subTest(name=name):
                 url = reverse(name)
-                response = self.client.get(url)
+                response = self.assertBudget(url, *ROUTE_BUDGETS[name])
                 self.assertEqual(response.status_code, HTTPStatus.OK)
 
     def test_pages_availability_for_different_users(self):
@@ -57,7 +76,7 @@ class TestRoutes(TestCase):
             for name in urls:
                 with self.subTest(user=user, name=name):
                     url = reverse(name, args=(self.note.slug,))
-                    response = self.client.get(url)
+                    response = self.assertBudget(url, *ROUTE_BUDGETS[name])
                     self.assertEqual(response.status_code, status)
 
     def test_redirect_for_anonymous_client(self):
@@ -74,5 +93,44 @@ class TestRoutes(TestCase):
             with self.subTest(name=name):
                 url = reverse(name, args=args)
                 redirect_url = f'{login_url}?next={url}'
-                response = self.client.get(url)
+                response = self.assertBudget(url, *REDIRECT_BUDGET)
                 self.assertRedirects(response, redirect_url)
+
+    def test_note_detail_answers_conditional_get(self):
+        url = reverse('notes:detail', args=(self.note.slug,))
+        self.client.force_login(self.author)
+        response = self.client.get(url)
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.note.text = 'Новое описание заметки'
+        self.note.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.client.force_login(self.not_author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_profiling_reports_per_route_stats(self):
+        request_stats.clear()
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('notes:list'))
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        url = reverse('profiling')
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.FOUND
+        )
+        self.client.force_login(
+            User.objects.create(username='Сотрудник', is_staff=True)
+        )
+        stats = self.client.get(url).json()['notes:list']
+        self.assertEqual(stats['requests'], 1)
+        self.assertGreaterEqual(stats['queries']['p99'], 1)
+        self.assertEqual(set(stats['duration_ms']), {'p50', 'p95', 'p99'})
+
+    def test_profiling_counts_sync_view_queries_under_asgi(self):
+        client = AsyncClient()
+        client.force_login(self.author)
+        response = async_to_sync(client.get)(reverse('notes:list'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotIn('"0 queries', response['Server-Timing'])
@@ -1,9 +1,23 @@
+import io
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.http import condition
 
-from .forms import NoteForm
+from .bulk import (
+    FORMATS, ImportFileError, export_notes, import_notes, read_rows
+)
+from .forms import NoteForm, NotesImportForm
 from .models import Note
+from .search import search_notes
+
+# Наибольший первичный ключ BigAutoField.
+MAX_NOTE_ID = 2 ** 63 - 1
 
 
 class Home(generic.TemplateView):
@@ -32,9 +46,8 @@ class NoteCreate(NoteBase, generic.CreateView):
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        """Автор задаётся до сохранения, чтобы заметка сохранилась один раз."""
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
@@ -50,10 +63,141 @@ class NoteDelete(NoteBase, generic.DeleteView):
 
 
 class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
+    """
+    Список заметок пользователя по страницам.
+
+    Размер страницы задаётся параметром page_size. С параметром after
+    список продолжается по курсору — с заметок, id которых больше after:
+    так дальние страницы не дороже первой.
+    """
     template_name = 'notes/list.html'
 
+    def get_queryset(self):
+        """Берём только поля, которые выводит шаблон."""
+        return super().get_queryset().only(
+            'id', 'slug', 'title'
+        ).order_by('id')
+
+    def get_paginate_by(self, queryset):
+        try:
+            page_size = int(self.request.GET['page_size'])
+        except (KeyError, ValueError):
+            return settings.NOTES_COUNT_ON_LIST_PAGE
+        return max(1, min(page_size, settings.NOTES_MAX_PAGE_SIZE))
+
+    def paginate_queryset(self, queryset, page_size):
+        after = self.request.GET.get('after')
+        if after is None:
+            return super().paginate_queryset(queryset, page_size)
+        try:
+            after = int(after)
+        except ValueError:
+            raise Http404('Неверный курсор списка заметок.')
+        # Больший id SQLite не примет: OverflowError вместо ответа.
+        if not 0 <= after <= MAX_NOTE_ID:
+            raise Http404('Неверный курсор списка заметок.')
+        notes = list(queryset.filter(pk__gt=after)[:page_size + 1])
+        self.next_after = (
+            notes[page_size - 1].pk if len(notes) > page_size else None
+        )
+        return None, None, notes[:page_size], False
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page_size'] = self.get_paginate_by(None)
+        context['next_after'] = getattr(self, 'next_after', None)
+        return context
+
+
+class NotesImport(LoginRequiredMixin, generic.FormView):
+    """Импорт заметок из файла JSON Lines или CSV."""
+    template_name = 'notes/import.html'
+    form_class = NotesImportForm
+
+    def form_valid(self, form):
+        """
+        Файл читается построчно, ответ — итог импорта в JSON.
+
+        Импорт идёт в одной транзакции: если файл не удалось дочитать,
+        форма возвращает ошибку и ни одна заметка не сохраняется.
+        """
+        lines = io.TextIOWrapper(
+            form.cleaned_data['file'].file, encoding='utf-8', newline=''
+        )
+        try:
+            with transaction.atomic():
+                result = import_notes(
+                    self.request.user,
+                    read_rows(lines, form.cleaned_data['format']),
+                )
+        except ImportFileError as error:
+            form.add_error('file', str(error))
+            return self.form_invalid(form)
+        return JsonResponse(result.as_dict())
+
+
+class NotesExport(LoginRequiredMixin, generic.View):
+    """Выгрузка всех заметок пользователя потоком."""
+    content_types = {
+        'jsonl': 'application/x-ndjson',
+        'csv': 'text/csv',
+    }
+
+    def get(self, request, *args, **kwargs):
+        file_format = request.GET.get('format', 'jsonl')
+        if file_format not in FORMATS:
+            raise Http404('Неизвестный формат выгрузки.')
+        response = StreamingHttpResponse(
+            export_notes(request.user, file_format),
+            content_type=self.content_types[file_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="notes.{file_format}"'
+        )
+        return response
+
+
+class NotesSearch(NoteBase, generic.ListView):
+    """Поиск по заголовкам и текстам заметок пользователя."""
+    template_name = 'notes/search.html'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return search_notes(self.request.user, self.request.GET.get('q', ''))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
+
+
+def note_modified(request, slug):
+    """
+    Время последнего изменения заметки текущего пользователя.
+
+    Значение запоминается в запросе, чтобы не читать его повторно.
+    """
+    if not hasattr(request, 'note_modified'):
+        request.note_modified = Note.objects.filter(
+            author=request.user, slug=slug
+        ).values_list('modified', flat=True).first()
+    return request.note_modified
+
+
+def note_etag(request, slug, **kwargs):
+    """
+    Заметку видит только автор, так что ETag — это slug и версия.
+
+    Last-Modified не отдаётся: при секундной точности правка в ту же
+    секунду получила бы 304 со старым текстом.
+    """
+    modified = note_modified(request, slug)
+    if modified is None:
+        return None
+    return f'{slug}-{modified.timestamp()}'
+
 
+@method_decorator(condition(etag_func=note_etag), name='get')
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
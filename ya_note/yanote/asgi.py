@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.core.management import call_command
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
 
 application = get_asgi_application()
+
+if settings.PRECOMPILE_TEMPLATES:
+    # Первый запрос не тратит время на разбор шаблонов.
+    call_command('precompile_templates', verbosity=0)
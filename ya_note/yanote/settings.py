@@ -22,6 +22,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanote.profiling.profiling_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,3 +88,27 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_COUNT_ON_LIST_PAGE = 50
+NOTES_MAX_PAGE_SIZE = 500
+
+# Движок поиска по заметкам: 'fts5', 'python' или 'auto' (FTS5, если есть).
+NOTES_SEARCH_BACKEND = 'auto'
+
+# Сколько последних замеров profiling_middleware хранить на маршрут.
+PROFILING_WINDOW = 1000
+
+# Асинхронные страницы чтения (notes.async_views) для развёртывания под ASGI
+# и размер пула потоков, в котором они обращаются к базе.
+ASYNC_READ_VIEWS = False
+ASYNC_VIEWS_THREADS = 8
+
+# PRAGMA для каждого нового соединения с SQLite (notes.database);
+# боевые значения — в settings_production.
+SQLITE_PRAGMAS = {}
+# Проверять постоянные соединения (CONN_MAX_AGE) в начале запроса.
+DATABASE_HEALTH_CHECKS = False
+
+# Компилировать все шаблоны при запуске WSGI/ASGI-приложения
+# (команда precompile_templates).
+PRECOMPILE_TEMPLATES = False
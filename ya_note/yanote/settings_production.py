@@ -0,0 +1,56 @@
+"""
+Боевой профиль: база данных и шаблоны.
+
+SQLite работает в режиме WAL: читатели не ждут писателя, а писатель
+при занятой базе ждёт до busy_timeout вместо немедленной ошибки
+«database is locked». synchronous=NORMAL в режиме WAL не теряет
+целостность, а fsync делается только при контрольной точке.
+Соединения со всеми базами живут между запросами и проверяются
+в начале следующего запроса.
+
+Шаблоны загружаются через кэширующий загрузчик независимо от DEBUG
+и компилируются при запуске приложения командой precompile_templates.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, TEMPLATES
+
+DATABASES = {
+    alias: {**database, 'CONN_MAX_AGE': 600}
+    for alias, database in DATABASES.items()
+}
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    # Миллисекунды.
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер кэша страниц в КиБ.
+    'cache_size': -64 * 1024,
+}
+
+DATABASE_HEALTH_CHECKS = True
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        # Каталоги приложений подключает загрузчик app_directories.
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+            'debug': False,
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+
+PRECOMPILE_TEMPLATES = True